@@ -4,21 +4,94 @@ Complete CAN Dashboard - Single File Solution
 Handles serial port selection, real-time CAN message display, and message sending
 """
 
-from flask import Flask, render_template_string, request, jsonify
+# Cooperative I/O when eventlet is available; must patch before other imports
+try:
+    import eventlet
+    eventlet.monkey_patch()
+    ASYNC_MODE = 'eventlet'
+except ImportError:
+    ASYNC_MODE = 'threading'
+
+from flask import Flask, Response, request
 from flask_socketio import SocketIO, emit
 import serial
 import serial.tools.list_ports
 import struct
+import hashlib
+import math
 import time
-import datetime
 import threading
 import json
-from collections import defaultdict
+from collections import Counter, deque
+from operator import itemgetter
 import traceback
+from functools import lru_cache
+
+# Payloads stay as bytes until serialized; `default=list` emits them as int arrays
+try:
+    import orjson
+    
+    def _dumps(obj):
+        return orjson.dumps(obj, default=list)
+    
+    class _OrjsonModule:
+        """json-module shim so Socket.IO packets are encoded with orjson"""
+        @staticmethod
+        def dumps(obj, *args, **kwargs):
+            return orjson.dumps(obj, default=list).decode('utf-8')
+        
+        @staticmethod
+        def loads(s, *args, **kwargs):
+            return orjson.loads(s)
+    
+    _SOCKETIO_JSON = _OrjsonModule
+except ImportError:
+    def _finite(obj):
+        """Copy of obj with NaN/Infinity floats replaced by None"""
+        if isinstance(obj, float):
+            return obj if math.isfinite(obj) else None
+        if isinstance(obj, dict):
+            return {k: _finite(v) for k, v in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [_finite(v) for v in obj]
+        return obj
+    
+    def _dumps(obj):
+        try:
+            return json.dumps(obj, separators=(',', ':'), default=list, allow_nan=False).encode('utf-8')
+        except ValueError:
+            # NaN/Infinity are not JSON and JSON.parse rejects them; write null
+            # like orjson does, so one bad frame can't spoil the whole batch
+            return json.dumps(_finite(obj), separators=(',', ':'), default=list).encode('utf-8')
+    
+    _SOCKETIO_JSON = json
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'can-dashboard-secret'
-socketio = SocketIO(app, cors_allowed_origins="*")
+socketio = SocketIO(app, async_mode=ASYNC_MODE, json=_SOCKETIO_JSON, cors_allowed_origins="*")
+
+# Precompiled wire formats (avoids re-parsing format strings per frame)
+_U32 = struct.Struct('<I')
+_F32_LE = struct.Struct('<f')
+_F32_BE = struct.Struct('>f')
+
+# Byte-swapped floats tend to land near zero (1e-38, 4e-8, ...); no real
+# reading is that small, so such values never count as in range
+_MIN_READING = 1e-3
+
+# Outgoing frame packers (ID, length, payload, timestamp), indexed by payload length
+_SEND_PACKERS = [struct.Struct(f'<IB{n}sI') for n in range(9)]
+
+_get_can_id = itemgetter('can_id')
+
+@lru_cache(maxsize=256)
+def _unknown_message_info(can_id):
+    """Shared (read-only) message info for CAN IDs without a known type"""
+    return {
+        'name': f'Unknown Message (0x{can_id:08X})',
+        'unit': '',
+        'type': 'raw'
+    }
 
 class CANDashboard:
     def __init__(self):
@@ -27,11 +100,14 @@ class CANDashboard:
         self.baudrate = 2000000
         self.running = False
         self.connected_clients = 0
+        # Bumped by every start_monitoring/disconnect_serial; background loops
+        # exit once it no longer matches the value they were started with
+        self._generation = 0
         
         # Statistics
         self.stats = {
             'total_messages': 0,
-            'messages_per_id': defaultdict(int),
+            'messages_per_id': Counter(),
             'start_time': None,
             'message_rate': 0
         }
@@ -43,9 +119,28 @@ class CANDashboard:
             0x10500001: {"name": "Transmission Fluid Temperature", "unit": "°F", "type": "float"}
         }
         
+        # Float decoders for known message types, keyed by CAN ID; the range
+        # is used to detect big-endian senders
+        self._decoders = {
+            0x10500101: self._make_range_decoder(0, 10),     # Gear
+            0x10300002: self._make_range_decoder(0, 200),    # Speed
+            0x10500001: self._make_range_decoder(50, 400)    # Temperature
+        }
+        
         # Recent messages for dashboard
-        self.recent_messages = []
         self.max_recent = 50
+        self.recent_messages = deque(maxlen=self.max_recent)
+        self.keep_recent_when_idle = False  # Fill recent_messages with no clients connected
+        
+        # Serial receive buffer; bytes before _rx_head are already consumed
+        self._rx = bytearray()
+        self._rx_head = 0
+        
+        # Latest message per CAN ID waiting for the next batched emit
+        self._pending = {}
+        self._flush_lock = threading.Lock()
+        self.batch_interval = 0.02  # seconds
+        self.max_batch = 64
     
     def get_available_ports(self):
         """Get list of available serial ports"""
@@ -70,14 +165,21 @@ class CANDashboard:
                 bytesize=serial.EIGHTBITS,
                 parity=serial.PARITY_NONE,
                 stopbits=serial.STOPBITS_ONE,
-                timeout=0.1
+                timeout=0.05,
+                inter_byte_timeout=None
             )
             
+            # Larger driver buffer so bursts survive between reads (Windows only)
+            if hasattr(self.serial_conn, 'set_buffer_size'):
+                self.serial_conn.set_buffer_size(rx_size=65536)
+            
             self.current_port = port
             self.baudrate = baudrate
             self.stats['start_time'] = time.time()
             self.stats['total_messages'] = 0
             self.stats['messages_per_id'].clear()
+            self._rx.clear()
+            self._rx_head = 0
             
             print(f"✅ Connected to {port} at {baudrate} baud")
             return True
@@ -89,82 +191,114 @@ class CANDashboard:
     def disconnect_serial(self):
         """Disconnect from serial port"""
         self.running = False
+        self._generation += 1
         if self.serial_conn and self.serial_conn.is_open:
             self.serial_conn.close()
         self.current_port = None
         print("🔌 Serial disconnected")
     
-    def parse_can_message(self, data):
-        """Parse binary CAN message"""
-        if len(data) < 9:  # Minimum message size
-            return None
-        
-        try:
-            # Parse CAN ID (4 bytes, little-endian)
-            can_id = struct.unpack('<I', data[0:4])[0]
-            
-            # Parse message length (1 byte)
-            msg_length = data[4]
+    def decode_frames(self, buffer, head=0):
+        """Decode every complete CAN frame in buffer from head.
+        
+        Returns (messages, new_head); bytes that cannot start a frame are
+        skipped and a trailing partial frame is left for the next read.
+        """
+        messages = []
+        append = messages.append
+        unpack_u32 = _U32.unpack_from
+        received = time.time()  # Frames from one read share an arrival time
+        end = len(buffer)
+        
+        while end - head >= 9:
+            msg_length = buffer[head + 4]
             if msg_length > 8:
-                return None
-            
-            # Parse data payload
-            payload = data[5:5+msg_length]
-            
-            # Parse timestamp (4 bytes after data)
-            if len(data) < 5 + msg_length + 4:
-                return None
+                head += 1  # Not a frame boundary, resync
+                continue
             
-            timestamp_raw = struct.unpack('<I', data[5+msg_length:9+msg_length])[0]
+            size = 9 + msg_length
+            if end - head < size:
+                break  # Frame not fully received yet
             
-            return {
-                'can_id': can_id,
+            payload = bytes(buffer[head + 5:head + 5 + msg_length])
+            append({
+                'can_id': unpack_u32(buffer, head)[0],
                 'length': msg_length,
-                'data': list(payload),
-                'timestamp_raw': timestamp_raw,
-                'timestamp': datetime.datetime.now(),
-                'raw_size': 9 + msg_length
-            }
-            
-        except (struct.error, IndexError) as e:
-            return None
+                'payload': payload,
+                'timestamp_raw': unpack_u32(buffer, head + 5 + msg_length)[0],
+                'timestamp': received,
+                'raw_size': size
+            })
+            head += size
+        
+        return messages, head
+    
+    @staticmethod
+    def _make_range_decoder(lo, hi, confirm_after=10, switch_after=3):
+        """Build a float decoder that learns the sender's endianness.
+        
+        Decodes with the current byte order. A value outside [lo, hi] (or
+        implausibly close to zero) is decoded with the other byte order, and
+        that result is used only if it is in range; otherwise the first value
+        is returned as is. Each in-range decode builds confidence (up to
+        confirm_after) and each rescue by the other byte order spends it.
+        Once it is gone, switch_after consecutive rescues switch the byte
+        order for good.
+        """
+        primary, fallback = _F32_LE.unpack_from, _F32_BE.unpack_from
+        confidence = 0
+        rescues = 0  # Consecutive rescues since confidence ran out
+        
+        def in_range(value):
+            return lo <= value <= hi and (value == 0.0 or abs(value) >= _MIN_READING)
+        
+        def decode(data):
+            nonlocal primary, fallback, confidence, rescues
+            value = primary(data, 0)[0]
+            if in_range(value):
+                if confidence < confirm_after:
+                    confidence += 1
+                rescues = 0
+                return value
+            
+            other = fallback(data, 0)[0]
+            if not in_range(other):
+                # Neither byte order fits; the reading really is out of range
+                rescues = 0
+                return value
+            
+            if confidence > 0:
+                confidence -= 1
+                return other
+            
+            rescues += 1
+            if rescues >= switch_after:
+                # No confidence left in this byte order; switch to the other one
+                primary, fallback = fallback, primary
+                rescues = 0
+            return other
+        return decode
     
     def interpret_message(self, msg):
         """Interpret CAN message data"""
         can_id = msg['can_id']
-        data = bytes(msg['data'])
         
+        info = self.message_types.get(can_id)
+        if info is None:
+            return {
+                'interpreted_value': None,
+                'message_info': _unknown_message_info(can_id)
+            }
+        
+        data = msg['payload']
         interpretation = {
-            'hex_data': ' '.join(f'{b:02X}' for b in data),
             'interpreted_value': None,
-            'message_info': self.message_types.get(can_id, {
-                'name': f'Unknown Message (0x{can_id:08X})',
-                'unit': '',
-                'type': 'raw'
-            })
+            'message_info': info
         }
         
         # Try to interpret as float for known message types
-        if can_id in self.message_types and len(data) >= 4:
-            try:
-                # Try little-endian first
-                float_val = struct.unpack('<f', data[:4])[0]
-                
-                # Validate ranges and switch endianness if needed
-                if can_id == 0x10500101:  # Gear
-                    if not (0 <= float_val <= 10):
-                        float_val = struct.unpack('>f', data[:4])[0]
-                elif can_id == 0x10300002:  # Speed
-                    if not (0 <= float_val <= 200):
-                        float_val = struct.unpack('>f', data[:4])[0]
-                elif can_id == 0x10500001:  # Temperature
-                    if not (50 <= float_val <= 400):
-                        float_val = struct.unpack('>f', data[:4])[0]
-                
-                interpretation['interpreted_value'] = float_val
-                
-            except struct.error:
-                pass
+        decoder = self._decoders.get(can_id)
+        if decoder and len(data) >= 4:
+            interpretation['interpreted_value'] = decoder(data)
         
         return interpretation
     
@@ -174,21 +308,12 @@ class CANDashboard:
             return False, "Serial port not connected"
         
         try:
-            # Create binary message
-            message = bytearray()
-            
-            # CAN ID (4 bytes, little-endian)
-            message.extend(struct.pack('<I', can_id))
-            
-            # Data length (1 byte)
-            message.append(len(data_bytes))
+            if len(data_bytes) > 8:
+                return False, "CAN payload must be 0-8 bytes"
             
-            # Data payload
-            message.extend(data_bytes)
-            
-            # Timestamp (4 bytes, current time in milliseconds)
+            # Build the whole frame in one pack; timestamp is current time in ms
             timestamp = int(time.time() * 1000) & 0xFFFFFFFF
-            message.extend(struct.pack('<I', timestamp))
+            message = _SEND_PACKERS[len(data_bytes)].pack(can_id, len(data_bytes), bytes(data_bytes), timestamp)
             
             # Send message
             self.serial_conn.write(message)
@@ -206,62 +331,93 @@ class CANDashboard:
             return False
         
         self.running = True
+        self._generation += 1
+        generation = self._generation
         
         def monitor_thread():
-            buffer = bytearray()
-            last_rate_calc = time.time()
-            last_msg_count = 0
+            rx = self._rx
             
-            while self.running and self.serial_conn and self.serial_conn.is_open:
+            while self.running and self._generation == generation and self.serial_conn and self.serial_conn.is_open:
                 try:
-                    # Read available data
-                    if self.serial_conn.in_waiting > 0:
-                        new_data = self.serial_conn.read(self.serial_conn.in_waiting)
-                        buffer.extend(new_data)
+                    # Block until a chunk arrives or the read times out
+                    chunk = self.serial_conn.read(4096)
+                    if chunk:
+                        rx.extend(chunk)
                     
-                    # Try to parse messages from buffer
-                    while len(buffer) >= 9:
-                        msg = self.parse_can_message(buffer)
-                        
-                        if msg:
-                            # Valid message found
+                    # Decode all complete messages in one pass
+                    messages, self._rx_head = self.decode_frames(rx, self._rx_head)
+                    if messages:
+                        # Count the whole burst in one C-level pass
+                        self.stats['total_messages'] += len(messages)
+                        self.stats['messages_per_id'].update(map(_get_can_id, messages))
+                        for msg in messages:
                             self.process_message(msg)
-                            buffer = buffer[msg['raw_size']:]
-                        else:
-                            # Remove first byte and try again
-                            buffer = buffer[1:]
-                    
-                    # Calculate message rate every second
-                    now = time.time()
-                    if now - last_rate_calc >= 1.0:
-                        current_count = self.stats['total_messages']
-                        self.stats['message_rate'] = current_count - last_msg_count
-                        last_msg_count = current_count
-                        last_rate_calc = now
-                        
-                        # Send stats update to clients
-                        if self.connected_clients > 0:
-                            socketio.emit('stats_update', self.get_stats())
                     
-                    time.sleep(0.001)  # Small delay
+                    # Drop consumed bytes; only compact once enough has built up
+                    if self._rx_head == len(rx):
+                        rx.clear()
+                        self._rx_head = 0
+                    elif self._rx_head > 8192:
+                        del rx[:self._rx_head]
+                        self._rx_head = 0
                     
                 except Exception as e:
                     print(f"❌ Monitor error: {e}")
                     traceback.print_exc()
                     break
             
-            self.running = False
+            # A newer session owns running now; leave it alone
+            if self._generation == generation:
+                self.running = False
             print("🛑 Monitoring stopped")
         
-        thread = threading.Thread(target=monitor_thread, daemon=True)
-        thread.start()
+        socketio.start_background_task(monitor_thread)
+        socketio.start_background_task(self.flush_loop, generation)
+        socketio.start_background_task(self.rate_loop, generation)
         return True
     
+    def rate_loop(self, generation):
+        """Update message_rate once per second and push stats to clients"""
+        last_count = self.stats['total_messages']
+        last_tick = time.monotonic()
+        
+        while True:
+            socketio.sleep(1.0)
+            if not self.running or self._generation != generation:
+                break  # Disconnected, or superseded by a reconnect during the sleep
+            now = time.monotonic()
+            current_count = self.stats['total_messages']
+            self.stats['message_rate'] = round((current_count - last_count) / (now - last_tick))
+            last_count = current_count
+            last_tick = now
+            
+            # Send stats update to clients
+            if self.connected_clients > 0:
+                socketio.emit('stats_update', self.get_stats())
+    
+    def flush_loop(self, generation):
+        """Periodically emit queued CAN messages as a single batch"""
+        while self.running and self._generation == generation:
+            socketio.sleep(self.batch_interval)
+            self.flush_pending()
+        self.flush_pending()
+    
+    def flush_pending(self):
+        """Emit all queued CAN messages to clients in one Socket.IO frame"""
+        with self._flush_lock:
+            batch = list(self._pending.values())
+            self._pending.clear()
+        
+        if batch and self.connected_clients > 0:
+            # Serialize once and ship as a binary attachment so Socket.IO
+            # does not re-encode the batch for every client
+            socketio.emit('can_message_batch', _dumps(batch))
+    
     def process_message(self, msg):
-        """Process parsed CAN message"""
-        # Update statistics
-        self.stats['total_messages'] += 1
-        self.stats['messages_per_id'][msg['can_id']] += 1
+        """Process parsed CAN message (statistics are counted per burst by the monitor)"""
+        # Nobody to show it to; skip interpretation and formatting
+        if self.connected_clients == 0 and not self.keep_recent_when_idle:
+            return
         
         # Interpret message
         interpretation = self.interpret_message(msg)
@@ -271,22 +427,24 @@ class CANDashboard:
             'can_id': f"0x{msg['can_id']:08X}",
             'can_id_int': msg['can_id'],
             'length': msg['length'],
-            'data': msg['data'],
-            'hex_data': interpretation['hex_data'],
-            'timestamp': msg['timestamp'].strftime('%H:%M:%S.%f')[:-3],
+            'data': msg['payload'],
+            'ts': msg['timestamp'],
             'message_name': interpretation['message_info']['name'],
             'message_unit': interpretation['message_info']['unit'],
             'interpreted_value': interpretation['interpreted_value']
         }
         
         # Add to recent messages
-        self.recent_messages.insert(0, dashboard_msg)
-        if len(self.recent_messages) > self.max_recent:
-            self.recent_messages.pop()
+        self.recent_messages.appendleft(dashboard_msg)
         
-        # Send to connected clients
+        # Queue for the next batched emit; a newer frame for the same ID
+        # replaces one that has not been sent yet
         if self.connected_clients > 0:
-            socketio.emit('can_message', dashboard_msg)
+            with self._flush_lock:
+                self._pending[msg['can_id']] = dashboard_msg
+                pending_count = len(self._pending)
+            if pending_count >= self.max_batch:
+                self.flush_pending()
     
     def get_stats(self):
         """Get current statistics"""
@@ -564,6 +722,7 @@ HTML_TEMPLATE = """
 
     <script>
         const socket = io();
+        const textDecoder = new TextDecoder();
         let isConnected = false;
         
         // Load available ports on page load
@@ -686,9 +845,16 @@ HTML_TEMPLATE = """
         }
         
         // Socket event handlers
-        socket.on('can_message', function(msg) {
+        function handleCanMessage(msg) {
             updateGauges(msg);
             addMessageToLog(msg);
+        }
+        
+        socket.on('can_message_batch', function(msgs) {
+            if (msgs instanceof ArrayBuffer) {
+                msgs = JSON.parse(textDecoder.decode(msgs));
+            }
+            msgs.forEach(handleCanMessage);
         });
         
         socket.on('stats_update', function(stats) {
@@ -720,6 +886,15 @@ HTML_TEMPLATE = """
             }
         }
         
+        function formatTimestamp(ts) {
+            const d = new Date(ts * 1000);
+            return d.toTimeString().slice(0, 8) + '.' + String(d.getMilliseconds()).padStart(3, '0');
+        }
+        
+        function formatHex(bytes) {
+            return bytes.map(b => b.toString(16).padStart(2, '0').toUpperCase()).join(' ');
+        }
+        
         function addMessageToLog(msg) {
             const logEntries = document.getElementById('messageEntries');
             const entry = document.createElement('div');
@@ -731,8 +906,8 @@ HTML_TEMPLATE = """
             }
             
             entry.innerHTML = `
-                <strong>[${msg.timestamp}]</strong> ${msg.message_name}<br>
-                ID: ${msg.can_id} | Len: ${msg.length} | Data: ${msg.hex_data}${valueStr}
+                <strong>[${formatTimestamp(msg.ts)}]</strong> ${msg.message_name}<br>
+                ID: ${msg.can_id} | Len: ${msg.length} | Data: ${formatHex(msg.data)}${valueStr}
             `;
             
             logEntries.insertBefore(entry, logEntries.firstChild);
@@ -750,15 +925,28 @@ HTML_TEMPLATE = """
 </html>
 """
 
+def json_response(obj):
+    """JSON response encoded with the same fast serializer as Socket.IO"""
+    return Response(_dumps(obj), mimetype='application/json')
+
+# The page has no template variables, so encode it once and skip Jinja
+_INDEX_BYTES = HTML_TEMPLATE.encode('utf-8')
+_INDEX_ETAG = hashlib.sha1(_INDEX_BYTES).hexdigest()
+
 @app.route('/')
 def index():
-    return render_template_string(HTML_TEMPLATE)
+    # Browsers revalidate on every load (a cheap 304 while unchanged), so a
+    # server update never leaves clients on a stale page
+    response = Response(_INDEX_BYTES, mimetype='text/html')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.set_etag(_INDEX_ETAG)
+    return response.make_conditional(request)
 
 @app.route('/api/ports')
 def get_ports():
     """Get available serial ports"""
     ports = dashboard.get_available_ports()
-    return jsonify({'ports': ports})
+    return json_response({'ports': ports})
 
 @app.route('/api/connect', methods=['POST'])
 def connect():
@@ -769,17 +957,17 @@ def connect():
     
     if dashboard.connect_serial(port, baudrate):
         if dashboard.start_monitoring():
-            return jsonify({'success': True})
+            return json_response({'success': True})
         else:
-            return jsonify({'success': False, 'error': 'Failed to start monitoring'})
+            return json_response({'success': False, 'error': 'Failed to start monitoring'})
     else:
-        return jsonify({'success': False, 'error': 'Failed to connect to serial port'})
+        return json_response({'success': False, 'error': 'Failed to connect to serial port'})
 
 @app.route('/api/disconnect', methods=['POST'])
 def disconnect():
     """Disconnect from serial port"""
     dashboard.disconnect_serial()
-    return jsonify({'success': True})
+    return json_response({'success': True})
 
 @app.route('/api/send', methods=['POST'])
 def send_message():
@@ -789,7 +977,7 @@ def send_message():
     data_bytes = bytes(data.get('data', []))
     
     success, message = dashboard.send_can_message(can_id, data_bytes)
-    return jsonify({'success': success, 'message': message})
+    return json_response({'success': success, 'message': message})
 
 @socketio.on('connect')
 def handle_connect():
@@ -814,7 +1002,7 @@ if __name__ == '__main__':
     
     args = parser.parse_args()
     
-    print(f"🚀 Starting CAN Dashboard Server...")
+    print(f"🚀 Starting CAN Dashboard Server ({ASYNC_MODE} mode)...")
     print(f"📊 Dashboard: http://{args.host}:{args.port}")
     print(f"🔧 Available endpoints:")
     print(f"   GET  / - Dashboard interface")
@@ -1,9 +1,66 @@
 #!/usr/bin/env python3
 
 import serial
+import sys
 import time
-import struct
-import re
+from array import array
+from collections import Counter
+
+# Fallback for data tokens fromhex() rejects ("0x4A", lowercase, "0x5")
+HEX_BYTE = {tok: i for i in range(256)
+            for tok in (f'0x{i:02X}', f'0x{i:02x}', f'0x{i:X}', f'0x{i:x}')}
+
+def parse_can_line(line):
+    """Parse a Teensy text frame
+    (CAN_ID=0x...,LEN=n,DATA=0x..,0x..,TIMESTAMP=t,FLAGS=0x..).
+    
+    Returns (can_id, length, data_bytes: bytes, timestamp), or None if the line
+    does not contain a complete frame.
+    """
+    start = line.find('CAN_ID=0x')
+    if start < 0:
+        return None
+    
+    p_len = line.find(',LEN=', start + 9)
+    p_data = line.find(',DATA=', p_len + 5)
+    p_ts = line.find(',TIMESTAMP=', p_data + 6)
+    p_flags = line.find(',FLAGS=0x', p_ts + 11)
+    if p_len < 0 or p_data < 0 or p_ts < 0 or p_flags < 0:
+        return None
+    
+    try:
+        can_id = int(line[start + 9:p_len], 16)
+        length = int(line[p_len + 5:p_data])
+        timestamp = int(line[p_ts + 11:p_flags])
+    except ValueError:
+        return None
+    
+    # Well-formed "0x41,0x20,..." data decodes in one C call; anything
+    # irregular (single-digit or stray tokens) goes through the lookup table
+    data_str = line[p_data + 6:p_ts]
+    try:
+        data_bytes = bytes.fromhex(data_str.replace('0x', '').replace(',', ' '))
+    except ValueError:
+        data_bytes = bytes(HEX_BYTE[tok] for tok in data_str.split(',') if tok in HEX_BYTE)
+    return can_id, length, data_bytes, timestamp
+
+def format_values(payloads):
+    """Format little-endian float payloads (4 bytes, or None) as value strings.
+    
+    All payloads are decoded in one array() call rather than one unpack each.
+    """
+    values = array('f', b''.join(p for p in payloads if p is not None))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    it = iter(values)
+    return [f"{next(it):.2f}" if p is not None else "N/A" for p in payloads]
+
+def write_pending(pending):
+    """Write and clear a batch of (can_id, payload, count) message lines"""
+    values = format_values([payload for _, payload, _ in pending])
+    sys.stdout.write(''.join(f"📝 0x{can_id:08X} = {value_str} (count: {count})\n"
+                             for (can_id, _, count), value_str in zip(pending, values)))
+    pending.clear()
 
 def debug_all_can_ids():
     """Capture and decode ALL CAN IDs to see what's actually being broadcast"""
@@ -18,60 +75,47 @@ def debug_all_can_ids():
         print(f"✅ Connected to Teensy at {baud_rate} baud")
         print("📡 Reading ALL CAN messages for 15 seconds...\n")
         
-        can_ids_seen = {}
-        can_pattern = re.compile(r'CAN_ID=0x([0-9A-F]+),LEN=(\d+),DATA=(.+?),TIMESTAMP=(\d+),FLAGS=0x([0-9A-F]+)')
+        counts = Counter()
+        last_payload = {}  # Latest float bytes per ID, decoded only when printed
+        pending = []  # (can_id, payload, count) lines, written in batches so stdout doesn't gate the loop
+        last_flush = time.monotonic()
         
         start_time = time.time()
         while time.time() - start_time < 15:
-            if ser.in_waiting > 0:
-                try:
-                    line = ser.readline().decode('utf-8', errors='replace').strip()
-                    match = can_pattern.search(line)
-                    if match:
-                        can_id_hex = match.group(1)
-                        can_id = int(can_id_hex, 16)
-                        length = int(match.group(2))
-                        data_str = match.group(3)
-                        timestamp = int(match.group(4))
-                        
-                        # Parse data bytes
-                        data_parts = data_str.split(',')
-                        data_bytes = []
-                        for part in data_parts:
-                            if part.startswith('0x'):
-                                data_bytes.append(int(part, 16))
-                        
-                        # Try to decode as float if length >= 4
-                        value_str = "N/A"
-                        if length >= 4 and len(data_bytes) >= 4:
-                            try:
-                                value = struct.unpack('<f', bytes(data_bytes[:4]))[0]
-                                value_str = f"{value:.2f}"
-                            except:
-                                value_str = "Invalid"
-                        
-                        # Track this CAN ID
-                        if can_id not in can_ids_seen:
-                            can_ids_seen[can_id] = {'count': 0, 'last_value': value_str}
-                        
-                        can_ids_seen[can_id]['count'] += 1
-                        can_ids_seen[can_id]['last_value'] = value_str
-                        
-                        # Print real-time
-                        print(f"📝 0x{can_id:08X} = {value_str} (count: {can_ids_seen[can_id]['count']})")
-                        
-                except Exception as e:
-                    pass  # Skip invalid lines
+            # readline() blocks in the OS until a line arrives or the timeout expires
+            try:
+                line = ser.readline().decode('utf-8', errors='replace').strip()
+                frame = parse_can_line(line)
+                if frame:
+                    can_id, length, data_bytes, timestamp = frame
+                    
+                    # Keep the float bytes if length >= 4; decoding waits for the flush
+                    payload = data_bytes[:4] if length >= 4 and len(data_bytes) >= 4 else None
+                    
+                    # Track this CAN ID
+                    counts[can_id] += 1
+                    last_payload[can_id] = payload
+                    
+                    # Print real-time (batched every 100 messages or 100 ms)
+                    pending.append((can_id, payload, counts[can_id]))
+                    
+            except Exception as e:
+                pass  # Skip invalid lines
             
-            time.sleep(0.01)
+            now = time.monotonic()
+            if pending and (len(pending) >= 100 or now - last_flush >= 0.1):
+                write_pending(pending)
+                last_flush = now
+        
+        write_pending(pending)
         
-        print(f"\n📊 SUMMARY - Found {len(can_ids_seen)} unique CAN IDs:")
+        print(f"\n📊 SUMMARY - Found {len(counts)} unique CAN IDs:")
         print("=" * 60)
         
         # Sort by CAN ID for easy reading
-        for can_id in sorted(can_ids_seen.keys()):
-            info = can_ids_seen[can_id]
-            print(f"🆔 0x{can_id:08X}: {info['count']:3d} messages, last value = {info['last_value']}")
+        ids = sorted(counts)
+        for can_id, value_str in zip(ids, format_values([last_payload[i] for i in ids])):
+            print(f"🆔 0x{can_id:08X}: {counts[can_id]:3d} messages, last value = {value_str}")
         
         # Check for expected IDs
         expected_ids = {
@@ -84,7 +128,7 @@ def debug_all_can_ids():
         print(f"\n🎯 EXPECTED ID CHECK:")
         print("=" * 40)
         for expected_id, description in expected_ids.items():
-            if expected_id in can_ids_seen:
+            if expected_id in counts:
                 print(f"✅ 0x{expected_id:08X} ({description}): FOUND")
             else:
                 print(f"❌ 0x{expected_id:08X} ({description}): MISSING")
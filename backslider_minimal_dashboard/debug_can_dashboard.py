@@ -6,8 +6,19 @@ Detailed CAN Message Analyzer - Parse and analyze the binary stream
 import serial
 import struct
 import time
+import re
+import os
+import selectors
 from collections import defaultdict
 
+# Valid CAN IDs (0x10000000-0x20000000) have 0x10-0x20 as their top byte,
+# which is the 4th byte of the little-endian ID
+_ID_TOP_BYTE = re.compile(rb'[\x10-\x20]')
+
+# Precompiled little-endian field formats
+_U32 = struct.Struct('<I')
+_F32 = struct.Struct('<f')
+
 def analyze_can_stream():
     # Connect to your serial port
     s = serial.Serial('/dev/cu.usbmodem160544701', 1000000, timeout=1)
@@ -15,62 +26,63 @@ def analyze_can_stream():
     print("Looking for CAN message format: [CAN_ID(4)][LEN(1)][DATA(8)][TIMESTAMP(4)][FLAGS(1)] = 18 bytes")
     
     buffer = bytearray()
+    pos = 0  # Read index into buffer; bytes before it are consumed
     message_count = 0
     
     # Expected message size for our CANMessage structure
     MESSAGE_SIZE = 18  # CAN_ID(4) + LEN(1) + DATA(8) + TIMESTAMP(4) + FLAGS(1)
     
-    for i in range(100):  # Run for ~10 seconds
-        data = s.read(100)
+    # Wake as soon as the port is readable and drain whatever the driver holds,
+    # rather than reading 100 bytes per fixed 100 ms tick
+    sel = selectors.DefaultSelector()
+    sel.register(s.fileno(), selectors.EVENT_READ)
+    
+    deadline = time.monotonic() + 10  # Run for ~10 seconds
+    while time.monotonic() < deadline:
+        if not sel.select(timeout=0.5):
+            continue
+        
+        data = os.read(s.fileno(), 65536)
         if data:
             buffer.extend(data)
             
             # Try to parse complete messages
-            while len(buffer) >= MESSAGE_SIZE:
+            while len(buffer) - pos >= MESSAGE_SIZE:
                 # Parse the CANMessage structure
-                try:
-                    can_id = struct.unpack('<I', buffer[0:4])[0]  # Little-endian CAN ID
-                    length = buffer[4]  # Data length
-                    data_bytes = buffer[5:13]  # 8 bytes of data
-                    timestamp = struct.unpack('<I', buffer[13:17])[0]  # Little-endian timestamp
-                    flags = buffer[17]  # Flags byte
+                can_id = _U32.unpack_from(buffer, pos)[0]  # Little-endian CAN ID
+                length = buffer[pos+4]  # Data length
+                data_bytes = buffer[pos+5:pos+13]  # 8 bytes of data
+                timestamp = _U32.unpack_from(buffer, pos+13)[0]  # Little-endian timestamp
+                flags = buffer[pos+17]  # Flags byte
+                
+                # Check if this looks like a valid CAN ID
+                if 0x10000000 <= can_id <= 0x20000000:
+                    # Try to parse the data as float (first 4 bytes)
+                    float_value = _F32.unpack_from(buffer, pos+5)[0]
                     
-                    # Check if this looks like a valid CAN ID
-                    if 0x10000000 <= can_id <= 0x20000000:
-                        # Try to parse the data as float (first 4 bytes)
-                        float_value = None
-                        try:
-                            float_value = struct.unpack('<f', data_bytes[0:4])[0]
-                        except:
-                            pass
-                        
-                        print(f"📦 Message {message_count}: CAN_ID=0x{can_id:08X}")
-                        print(f"   Length: {length}, Data: {data_bytes.hex().upper()}")
-                        if float_value is not None:
-                            print(f"   Float Value: {float_value:.2f}")
-                        print(f"   Timestamp: {timestamp}")
-                        print(f"   Flags: 0x{flags:02X}")
-                        print(f"   Raw bytes: {buffer[0:MESSAGE_SIZE].hex().upper()}")
-                        print()
-                        
-                        message_count += 1
-                        
-                        # Remove the parsed message from buffer
-                        buffer = buffer[MESSAGE_SIZE:]
-                    else:
-                        # Not a valid CAN ID, shift buffer by 1 byte
-                        buffer = buffer[1:]
-                        
-                except struct.error:
-                    # Invalid data, shift buffer by 1 byte
-                    buffer = buffer[1:]
+                    print(f"📦 Message {message_count}: CAN_ID=0x{can_id:08X}")
+                    print(f"   Length: {length}, Data: {data_bytes.hex().upper()}")
+                    print(f"   Float Value: {float_value:.2f}")
+                    print(f"   Timestamp: {timestamp}")
+                    print(f"   Flags: 0x{flags:02X}")
+                    print(f"   Raw bytes: {buffer[pos:pos+MESSAGE_SIZE].hex().upper()}")
+                    print()
+                    
+                    message_count += 1
+                    
+                    # Step past the parsed message
+                    pos += MESSAGE_SIZE
+                else:
+                    # Not a valid CAN ID; jump straight to the next offset whose
+                    # top ID byte is in range (keep a possible partial ID at the end)
+                    match = _ID_TOP_BYTE.search(buffer, pos + 4)
+                    pos = match.start() - 3 if match else len(buffer) - 3
             
-            # Keep buffer manageable
-            if len(buffer) > 2000:
-                buffer = buffer[-1000:]
-        
-        time.sleep(0.1)
+            # Drop consumed bytes once per read instead of once per message
+            del buffer[:pos]
+            pos = 0
     
+    sel.close()
     s.close()
     
     print(f"\n📊 ANALYSIS COMPLETE:")
@@ -3,11 +3,19 @@
 Debug Dashboard - Shows all raw data and parsing attempts
 """
 
+import queue
 import serial
+import sys
 import time
 import struct
 import threading
 
+# Precompiled little-endian field formats
+_U32 = struct.Struct('<I')
+_F32 = struct.Struct('<f')
+_PARAM_DATA = struct.Struct('<Bfbbb')  # operation, value, source channel, request ID, reserved
+_CAN_HDR = struct.Struct('<II2xBB')      # CAN ID, timestamp, (2 pad), flags, length
+
 class DebugECUClient:
     """Debug ECU client with detailed logging"""
     
@@ -20,11 +28,28 @@ class DebugECUClient:
     READ_REQUEST = 0x01
     READ_RESPONSE = 0x03
     
-    def __init__(self):
+    DUMP_BYTES = 64  # Cap on the verbose pending-buffer hex dump
+    
+    def __init__(self, verbose: bool = True):
         self.serial_conn = None
+        self.verbose = verbose  # Per-byte/per-frame tracing; results and errors always print
+        self._out = []  # Lines queued by the parser, written once per read burst
+        self.raw_q = queue.SimpleQueue()  # Raw chunks from the reader thread; None ends the parser
+        
+        # Outgoing read request; only the CAN ID (bytes 0-3) changes per send
+        self._tmpl = bytearray(24)
+        self._tmpl[11] = 8
+        self._tmpl[12:20] = _PARAM_DATA.pack(
+            self.READ_REQUEST,  # Operation
+            0.0,                # Value
+            1,                  # Source channel
+            42,                 # Request ID
+            0                   # Reserved
+        )
         self.is_connected = False
         self.is_running = False
         self.buffer = bytearray()
+        self._r = 0  # Read index into buffer; bytes before it are consumed
         self.stats = {
             'total_requests': 0,
             'total_responses': 0,
@@ -59,121 +84,166 @@ class DebugECUClient:
         print("🔌 Disconnected")
     
     def start_monitoring(self):
-        """Start monitoring thread"""
+        """Start reader and parser threads"""
+        self.parser_thread = threading.Thread(target=self._parse_worker, daemon=True)
+        self.parser_thread.start()
         self.monitor_thread = threading.Thread(target=self._monitor_serial, daemon=True)
         self.monitor_thread.start()
         print("📡 Started serial monitoring")
     
     def _monitor_serial(self):
-        """Monitor serial port with detailed logging"""
+        """Read the serial port and hand raw chunks to the parser thread"""
         print("🔍 Starting serial monitor...")
         
         while self.is_running and self.is_connected:
             try:
-                if self.serial_conn.in_waiting > 0:
-                    data = self.serial_conn.read(self.serial_conn.in_waiting)
-                    if data:
-                        self.stats['raw_bytes_received'] += len(data)
-                        print(f"📥 Received {len(data)} bytes: {data.hex()}")
-                        
-                        # Add to buffer
-                        self.buffer.extend(data)
-                        
-                        # Process buffer
-                        self._process_buffer()
-                
-                time.sleep(0.001)
+                # Block until at least one byte arrives (or the timeout), then take the burst
+                data = self.serial_conn.read(self.serial_conn.in_waiting or 1)
+                if data:
+                    self.stats['raw_bytes_received'] += len(data)
+                    # Parsing and printing happen on the parser thread, so a
+                    # slow terminal can't stall reads and overflow the port
+                    self.raw_q.put(data)
                 
             except Exception as e:
                 print(f"❌ Monitor error: {e}")
                 break
         
+        self.raw_q.put(None)
         print("🔍 Serial monitor stopped")
     
+    def _parse_worker(self):
+        """Frame and decode chunks queued by _monitor_serial"""
+        while True:
+            data = self.raw_q.get()
+            if data is None:
+                break
+            
+            if self.verbose:
+                self._out.append(f"📥 Received {len(data)} bytes: {data.hex()}")
+            
+            # Add to buffer
+            self.buffer.extend(data)
+            
+            # Process buffer
+            self._process_buffer()
+            self._flush_output()
+    
+    def _flush_output(self):
+        """Write the lines queued by the parser in one go"""
+        if self._out:
+            self._out.append('')
+            sys.stdout.write('\n'.join(self._out))
+            self._out.clear()
+    
     def _process_buffer(self):
         """Process buffer with detailed logging"""
-        if not self.buffer:
+        if self._r >= len(self.buffer):
             return
         
-        print(f"🔍 Processing buffer ({len(self.buffer)} bytes): {self.buffer.hex()}")
+        out = self._out
+        verbose = self.verbose
+        if verbose:
+            # Only hex-dump the head of the pending bytes; the full stream is
+            # already shown once by the "Received" line in _monitor_serial
+            pending = len(self.buffer) - self._r
+            preview = self.buffer[self._r:self._r + self.DUMP_BYTES].hex()
+            if pending > self.DUMP_BYTES:
+                preview += '...'
+            out.append(f"🔍 Processing buffer ({pending} bytes): {preview}")
         
         # Look for text messages first
-        text_end = -1
-        for i, byte in enumerate(self.buffer):
-            if byte == ord('\n'):
-                text_end = i + 1
-                break
+        text_end = self.buffer.find(b'\n', self._r) + 1
         
         if text_end > 0:
-            text_data = self.buffer[:text_end]
+            text_data = self.buffer[self._r:text_end]
             try:
                 text = text_data.decode('utf-8', errors='ignore')
-                print(f"📝 Text message: {repr(text)}")
+                out.append(f"📝 Text message: {repr(text)}")
             except:
-                print(f"📝 Raw text bytes: {text_data.hex()}")
+                out.append(f"📝 Raw text bytes: {text_data.hex()}")
             
-            self.buffer = self.buffer[text_end:]
-            print(f"🔍 Buffer after text: {len(self.buffer)} bytes")
+            self._r = text_end
+            if verbose:
+                out.append(f"🔍 Buffer after text: {len(self.buffer) - self._r} bytes")
         
         # Look for CAN messages
-        while len(self.buffer) >= 24:
-            print(f"🔍 Checking for CAN message at start of buffer...")
+        while len(self.buffer) - self._r >= 24:
+            if verbose:
+                out.append(f"🔍 Checking for CAN message at start of buffer...")
             
-            if self._is_valid_can_message(self.buffer[:24]):
-                print(f"✅ Valid CAN message found!")
-                if self._try_parse_can_message(self.buffer[:24]):
-                    print(f"✅ CAN message parsed successfully!")
-                    self.buffer = self.buffer[24:]
+            # Validate and parse in place rather than slicing a frame per position
+            if self._is_valid_can_message(self.buffer, self._r):
+                if verbose:
+                    out.append(f"✅ Valid CAN message found!")
+                if self._try_parse_can_message(self.buffer, self._r):
+                    if verbose:
+                        out.append(f"✅ CAN message parsed successfully!")
+                    self._r += 24
                 else:
-                    print(f"❌ CAN message parsing failed")
-                    self.buffer = self.buffer[1:]
+                    if verbose:
+                        out.append(f"❌ CAN message parsing failed")
+                    self._r += 1
             else:
-                print(f"❌ Not a valid CAN message")
-                self.buffer = self.buffer[1:]
+                if verbose:
+                    out.append(f"❌ Not a valid CAN message")
+                self._r += 1
+        
+        # Compact only when everything is consumed or enough has built up
+        if self._r == len(self.buffer):
+            self.buffer.clear()
+            self._r = 0
+        elif self._r > 32768:
+            del self.buffer[:self._r]
+            self._r = 0
     
-    def _is_valid_can_message(self, data: bytes) -> bool:
-        """Check if data looks like a valid CAN message"""
-        if len(data) != 24:
-            print(f"❌ Invalid length: {len(data)} (expected 24)")
+    def _is_valid_can_message(self, data: bytes, offset: int = 0) -> bool:
+        """Check if the 24 bytes at offset look like a valid CAN message"""
+        verbose = self.verbose
+        if len(data) - offset < 24:
+            if verbose:
+                self._out.append(f"❌ Invalid length: {len(data) - offset} (expected 24)")
             return False
         
         try:
-            can_id = struct.unpack('<I', data[0:4])[0]
-            length = data[11]
+            can_id = _U32.unpack_from(data, offset)[0]
+            length = data[offset + 11]
             
-            print(f"🔍 CAN ID: 0x{can_id:08X}, Length: {length}")
+            if verbose:
+                self._out.append(f"🔍 CAN ID: 0x{can_id:08X}, Length: {length}")
             
             if can_id > 0x1FFFFFFF or can_id == 0:
-                print(f"❌ Invalid CAN ID: 0x{can_id:08X}")
+                if verbose:
+                    self._out.append(f"❌ Invalid CAN ID: 0x{can_id:08X}")
                 return False
             
             if length > 8:
-                print(f"❌ Invalid length: {length}")
+                if verbose:
+                    self._out.append(f"❌ Invalid length: {length}")
                 return False
             
             if can_id in self.PARAMETERS:
-                print(f"✅ Known parameter: {self.PARAMETERS[can_id]}")
+                if verbose:
+                    self._out.append(f"✅ Known parameter: {self.PARAMETERS[can_id]}")
                 return True
             
-            print(f"⚠️ Unknown CAN ID: 0x{can_id:08X}")
+            if verbose:
+                self._out.append(f"⚠️ Unknown CAN ID: 0x{can_id:08X}")
             return True
             
         except Exception as e:
-            print(f"❌ CAN validation error: {e}")
+            self._out.append(f"❌ CAN validation error: {e}")
             return False
     
-    def _try_parse_can_message(self, buffer: bytearray) -> bool:
-        """Try to parse a CAN message"""
+    def _try_parse_can_message(self, buffer: bytearray, offset: int = 0) -> bool:
+        """Try to parse the CAN message at offset"""
         try:
-            can_id = struct.unpack('<I', buffer[0:4])[0]
-            timestamp = struct.unpack('<I', buffer[4:8])[0]
-            length = buffer[11]
-            flags = buffer[10]
-            data = buffer[12:20]
-            reserved = buffer[20:24]
+            can_id, timestamp, flags, length = _CAN_HDR.unpack_from(buffer, offset)
+            data = buffer[offset + 12:offset + 20]
             
-            print(f"🔍 Parsed: ID=0x{can_id:08X}, len={length}, flags={flags}")
-            print(f"🔍 Data: {data.hex()}")
+            if self.verbose:
+                self._out.append(f"🔍 Parsed: ID=0x{can_id:08X}, len={length}, flags={flags}")
+                self._out.append(f"🔍 Data: {data.hex()}")
             
             if can_id in self.PARAMETERS and length == 8:
                 return self._process_parameter_response(can_id, data)
@@ -181,26 +251,27 @@ class DebugECUClient:
             return True
             
         except Exception as e:
-            print(f"❌ Parse error: {e}")
+            self._out.append(f"❌ Parse error: {e}")
             return False
     
     def _process_parameter_response(self, can_id: int, data: bytes) -> bool:
         """Process parameter response"""
         try:
             operation = data[0]
-            value = struct.unpack('<f', data[1:5])[0]
+            value = _F32.unpack_from(data, 1)[0]
             source_channel = data[5]
             request_id = data[6]
             reserved = data[7]
             
-            print(f"🔍 Parameter: op={operation}, value={value:.2f}, channel={source_channel}, req_id={request_id}")
+            if self.verbose:
+                self._out.append(f"🔍 Parameter: op={operation}, value={value:.2f}, channel={source_channel}, req_id={request_id}")
             
             if operation != self.READ_RESPONSE:
-                print(f"❌ Not a READ_RESPONSE: {operation}")
+                self._out.append(f"❌ Not a READ_RESPONSE: {operation}")
                 return False
             
             param_name = self.PARAMETERS.get(can_id, "Unknown")
-            print(f"✅ {param_name}: {value:.2f}")
+            self._out.append(f"✅ {param_name}: {value:.2f}")
             
             self.stats['total_responses'] += 1
             self.stats['successful_responses'] += 1
@@ -208,28 +279,15 @@ class DebugECUClient:
             return True
             
         except Exception as e:
-            print(f"❌ Parameter processing error: {e}")
+            self._out.append(f"❌ Parameter processing error: {e}")
             self.stats['parse_errors'] += 1
             return False
     
     def send_parameter_request(self, can_id: int):
         """Send a parameter request"""
         try:
-            param_data = struct.pack('<Bfbbb', 
-                self.READ_REQUEST,  # Operation
-                0.0,                # Value
-                1,                  # Source channel
-                42,                 # Request ID
-                0                   # Reserved
-            )
-            
-            message = bytearray(24)
-            message[0:4] = struct.pack('<I', can_id)
-            message[11] = 8
-            message[12:20] = param_data
-            
-            self.serial_conn.write(bytes(message))
-            self.serial_conn.flush()
+            _U32.pack_into(self._tmpl, 0, can_id)
+            self.serial_conn.write(self._tmpl)
             
             param_name = self.PARAMETERS.get(can_id, "Unknown")
             print(f"📤 Sent request for {param_name} (0x{can_id:08X})")
@@ -238,6 +296,22 @@ class DebugECUClient:
         except Exception as e:
             print(f"❌ Send error: {e}")
     
+    def send_batch(self, can_ids):
+        """Send read requests for several parameters in a single write"""
+        try:
+            can_ids = list(can_ids)
+            buf = bytearray(24 * len(can_ids))
+            for i, can_id in enumerate(can_ids):
+                buf[i * 24:(i + 1) * 24] = self._tmpl
+                _U32.pack_into(buf, i * 24, can_id)
+            self.serial_conn.write(buf)
+            
+            print(f"📤 Sent batch of {len(can_ids)} requests")
+            self.stats['total_requests'] += len(can_ids)
+            
+        except Exception as e:
+            print(f"❌ Send error: {e}")
+    
     def get_stats(self):
         """Get current statistics"""
         return self.stats.copy()
@@ -255,11 +329,10 @@ def main():
     client.start_monitoring()
     
     try:
-        # Send requests for each parameter
-        for can_id, param_name in client.PARAMETERS.items():
-            print(f"\n📤 Testing {param_name}...")
-            client.send_parameter_request(can_id)
-            time.sleep(2)  # Wait 2 seconds for response
+        # Request every parameter in a single write
+        print(f"\n📤 Testing {', '.join(client.PARAMETERS.values())}...")
+        client.send_batch(client.PARAMETERS)
+        time.sleep(2)  # Wait 2 seconds for responses
         
         # Keep monitoring for a bit
         print("\n📡 Monitoring for 10 seconds...")
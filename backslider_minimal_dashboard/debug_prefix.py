@@ -4,8 +4,13 @@ Debug script to see what bytes are being received
 """
 
 import serial
+import struct
 import time
 
+# Precompiled little-endian field formats
+_U32 = struct.Struct('<I')
+_PARAM_DATA = struct.Struct('<Bfbbb')  # operation, value, source channel, request ID, reserved
+
 def debug_bytes():
     """Debug what bytes are being received"""
     
@@ -25,10 +30,10 @@ def debug_bytes():
         
         # Send a single parameter request
         can_id = 0x10500001  # Fluid Temperature
-        param_data = struct.pack('<Bfbbb', 0x01, 0.0, 0x01, 42, 0)  # READ_REQUEST
+        param_data = _PARAM_DATA.pack(0x01, 0.0, 0x01, 42, 0)  # READ_REQUEST
         
         message = bytearray(24)
-        message[0:4] = struct.pack('<I', can_id)
+        message[0:4] = _U32.pack(can_id)
         message[11] = 8  # len
         message[12:20] = param_data
         
@@ -42,6 +47,7 @@ def debug_bytes():
         start_time = time.time()
         
         buffer = bytearray()
+        scan_from = 0  # Everything before this has already been searched
         
         while time.time() - start_time < 3:  # Wait 3 seconds
             if ser.in_waiting > 0:
@@ -51,16 +57,22 @@ def debug_bytes():
                 # Show the raw bytes
                 print(f"📥 Received {len(data)} bytes: {data.hex()}")
                 
-                # Look for 0xFF 0xFF in the entire buffer
-                for i in range(len(buffer) - 1):
-                    if buffer[i] == 0xFF and buffer[i + 1] == 0xFF:
-                        print(f"🎯 Found 0xFF 0xFF at position {i} in buffer!")
-                        
-                        # Show context around the prefix
-                        start_pos = max(0, i - 5)
-                        end_pos = min(len(buffer), i + 30)
-                        context = buffer[start_pos:end_pos]
-                        print(f"   Context: {context.hex()}")
+                # Look for 0xFF 0xFF in the newly received part of the buffer
+                while True:
+                    i = buffer.find(b'\xff\xff', scan_from)
+                    if i < 0:
+                        break
+                    print(f"🎯 Found 0xFF 0xFF at position {i} in buffer!")
+                    
+                    # Show context around the prefix
+                    start_pos = max(0, i - 5)
+                    end_pos = min(len(buffer), i + 30)
+                    context = buffer[start_pos:end_pos]
+                    print(f"   Context: {context.hex()}")
+                    scan_from = i + 1
+                
+                # A trailing 0xFF may pair with the first byte of the next read
+                scan_from = max(scan_from, len(buffer) - 1)
             
             time.sleep(0.01)
         
@@ -77,5 +89,4 @@ def debug_bytes():
         print(f"❌ Error: {e}")
 
 if __name__ == "__main__":
-    import struct
     debug_bytes() 
\ No newline at end of file
@@ -5,6 +5,11 @@ Debug Serial Monitor - Read and display serial output from Teensy
 
 import serial
 import time
+import re
+
+# One pass over each line tags every keyword of interest by group name; the
+# zero-width lookahead lets keywords that share characters all be found
+_KEYWORDS = re.compile(r'(?=(?P<read>reading fluid temp)|(?P<fluid>fluid temp|trans fluid)|(?P<publish>publishing))')
 
 def debug_serial_monitor():
     print("🔍 Debug Serial Monitor - Reading Teensy output...")
@@ -34,12 +39,15 @@ def debug_serial_monitor():
                             print(f"📝 {line}")
                             
                             # Look for specific debug messages
-                            if "fluid temp" in line.lower() or "trans fluid" in line.lower():
-                                print(f"🎯 FOUND FLUID TEMP DEBUG: {line}")
-                            if "publishing" in line.lower() and "temp" in line.lower():
-                                print(f"🎯 FOUND TEMP PUBLISH: {line}")
-                            if "reading fluid temp" in line.lower():
-                                print(f"🎯 FOUND FLUID TEMP READ: {line}")
+                            low = line.lower()
+                            tags = {m.lastgroup for m in _KEYWORDS.finditer(low)}
+                            if tags:
+                                if 'fluid' in tags or 'read' in tags:
+                                    print(f"🎯 FOUND FLUID TEMP DEBUG: {line}")
+                                if 'publish' in tags and "temp" in low:
+                                    print(f"🎯 FOUND TEMP PUBLISH: {line}")
+                                if 'read' in tags:
+                                    print(f"🎯 FOUND FLUID TEMP READ: {line}")
                     except UnicodeDecodeError:
                         # Skip binary data
                         pass
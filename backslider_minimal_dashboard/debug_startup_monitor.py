@@ -22,15 +22,13 @@ def monitor_startup():
         
         start_time = time.time()
         while time.time() - start_time < 30:
-            if ser.in_waiting > 0:
-                try:
-                    line = ser.readline().decode('utf-8', errors='replace').strip()
-                    if line:
-                        print(f"📝 {line}")
-                except Exception as e:
-                    print(f"❌ Error reading line: {e}")
-            
-            time.sleep(0.01)  # Small delay to prevent excessive CPU usage
+            # readline() blocks in the OS until a line arrives or the timeout expires
+            try:
+                line = ser.readline().decode('utf-8', errors='replace').strip()
+                if line:
+                    print(f"📝 {line}")
+            except Exception as e:
+                print(f"❌ Error reading line: {e}")
             
         print("\n✅ Monitoring complete")
         ser.close()
@@ -7,6 +7,10 @@ import serial
 import struct
 import time
 
+# 18-byte frame: CAN ID, length, 8 data bytes, timestamp, flags
+_FRAME = struct.Struct('<IB8sIB')
+_F32 = struct.Struct('<f')
+
 def find_fluid_temp_messages():
     # Connect to your serial port
     s = serial.Serial('/dev/cu.usbmodem160544701', 115200, timeout=1)
@@ -20,65 +24,68 @@ def find_fluid_temp_messages():
     FLUID_TEMP_PATTERN = b'\x01\x00P\x10'  # 0x10500001 in little-endian
     GEAR_PATTERN = b'\x01\x01P\x10'        # 0x10500101 in little-endian
     
+    pos = 0  # Read cursor; bytes before it have been scanned
     for i in range(100):  # Run for ~10 seconds
         data = s.read(100)
         if data:
             buffer.extend(data)
             
-            # Look for patterns in the buffer
-            while len(buffer) >= 4:
-                # Check for fluid temp pattern
-                if buffer[0:4] == FLUID_TEMP_PATTERN:
-                    fluid_temp_count += 1
-                    print(f"🎯 FOUND FLUID TEMP MESSAGE #{fluid_temp_count}")
-                    print(f"   Raw bytes: {buffer[0:18].hex().upper()}")
-                    
-                    # Try to parse the message
-                    if len(buffer) >= 18:
-                        try:
-                            can_id = struct.unpack('<I', buffer[0:4])[0]
-                            length = buffer[4]
-                            data_bytes = buffer[5:13]
-                            timestamp = struct.unpack('<I', buffer[13:17])[0]
-                            flags = buffer[17]
-                            
-                            print(f"   CAN_ID: 0x{can_id:08X}")
-                            print(f"   Length: {length}")
-                            print(f"   Data: {data_bytes.hex().upper()}")
-                            print(f"   Timestamp: {timestamp}")
-                            print(f"   Flags: 0x{flags:02X}")
-                            
-                            # Try to parse as float
-                            try:
-                                float_value = struct.unpack('<f', data_bytes[0:4])[0]
-                                print(f"   Float Value: {float_value:.2f}°C")
-                            except:
-                                print(f"   Float Value: Invalid")
-                            print()
-                            
-                            # Remove the message from buffer
-                            buffer = buffer[18:]
-                        except:
-                            print(f"   Parse Error")
-                            buffer = buffer[1:]
-                    else:
-                        # Not enough data, wait for more
-                        break
-                        
+            # Jump straight to the next occurrence of either pattern
+            while True:
+                f = buffer.find(FLUID_TEMP_PATTERN, pos)
+                g = buffer.find(GEAR_PATTERN, pos)
+                
+                if f == -1 and g == -1:
+                    # No pattern found; keep the tail in case one is split across reads
+                    pos = max(pos, len(buffer) - 3)
+                    break
+                
                 # Check for gear pattern
-                elif buffer[0:4] == GEAR_PATTERN:
+                if f == -1 or (g != -1 and g < f):
                     gear_count += 1
                     if gear_count <= 5:  # Only show first 5 gear messages
                         print(f"⚙️  Found gear message #{gear_count}")
-                    buffer = buffer[1:]  # Move forward
-                    
+                    pos = g + 1  # Move forward
+                    continue
+                
+                # Fluid temp pattern
+                fluid_temp_count += 1
+                print(f"🎯 FOUND FLUID TEMP MESSAGE #{fluid_temp_count}")
+                print(f"   Raw bytes: {buffer[f:f + 18].hex().upper()}")
+                
+                # Try to parse the message
+                if len(buffer) - f >= 18:
+                    try:
+                        can_id, length, data_bytes, timestamp, flags = _FRAME.unpack_from(buffer, f)
+                        
+                        print(f"   CAN_ID: 0x{can_id:08X}")
+                        print(f"   Length: {length}")
+                        print(f"   Data: {data_bytes.hex().upper()}")
+                        print(f"   Timestamp: {timestamp}")
+                        print(f"   Flags: 0x{flags:02X}")
+                        
+                        # Try to parse as float
+                        try:
+                            float_value = _F32.unpack_from(data_bytes, 0)[0]
+                            print(f"   Float Value: {float_value:.2f}°C")
+                        except:
+                            print(f"   Float Value: Invalid")
+                        print()
+                        
+                        # Skip past the message
+                        pos = f + 18
+                    except:
+                        print(f"   Parse Error")
+                        pos = f + 1
                 else:
-                    # No pattern found, move forward
-                    buffer = buffer[1:]
+                    # Not enough data, wait for more
+                    pos = f
+                    break
             
-            # Keep buffer manageable
-            if len(buffer) > 2000:
-                buffer = buffer[-1000:]
+            # Drop scanned bytes only once enough build up
+            if pos > 4096:
+                del buffer[:pos]
+                pos = 0
         
         time.sleep(0.1)
     
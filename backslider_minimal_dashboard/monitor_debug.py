@@ -3,20 +3,23 @@
 Simple script to monitor serial output and see debug messages
 """
 
+import selectors
 import serial
-import time
 
 def monitor_serial():
     try:
         ser = serial.Serial('/dev/cu.usbmodem160544701', 115200, timeout=1)
         print("Monitoring serial output... Press Ctrl+C to stop")
         
+        # Sleep in the kernel until the port has data instead of polling
+        sel = selectors.DefaultSelector()
+        sel.register(ser.fileno(), selectors.EVENT_READ)
+        
         while True:
-            if ser.in_waiting > 0:
+            if sel.select(timeout=1.0):
                 line = ser.readline().decode('utf-8', errors='ignore').strip()
                 if line:
                     print(f"SERIAL: {line}")
-            time.sleep(0.1)
             
     except KeyboardInterrupt:
         print("\nMonitoring stopped")
@@ -8,12 +8,20 @@ import time
 import struct
 import threading
 import logging
+from types import MappingProxyType
 from typing import Dict, Any
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Precompiled little-endian field formats
+_U32 = struct.Struct('<I')
+# Whole 24-byte frame: CAN ID, timestamp, (2 pad), flags, length, then the
+# parameter data (operation, value, source channel, request ID, reserved)
+_CAN_FRAME = struct.Struct('<II2xBBBfBBb4x')
+_REQ_DATA = struct.Struct('<BfBBb')   # operation, value, source channel, request ID, reserved
+
 class PrefixECUClient:
     """ECU client using 0xFF 0xFF prefix for binary message framing"""
     
@@ -31,11 +39,15 @@ class PrefixECUClient:
     CAN_MESSAGE_SIZE = 24
     TOTAL_BINARY_SIZE = 2 + CAN_MESSAGE_SIZE  # prefix + CAN message
     
+    # Firmware log prefixes worth surfacing at DEBUG
+    DEBUG_KEYWORDS = (b'ParameterRegistry:', b'SerialBridge:', b'MessageBus:')
+    
     def __init__(self):
         self.serial_conn = None
         self.is_connected = False
         self.is_running = False
         self.buffer = bytearray()
+        self._read_pos = 0  # Bytes before this index in buffer are consumed
         self.parameter_values = {}
         self.stats = {
             'total_requests': 0,
@@ -49,6 +61,11 @@ class PrefixECUClient:
         }
         self.request_interval = 1.0  # seconds
         self.next_request_id = 1
+        
+        # Reusable prefixed request frame; only the CAN ID and parameter data change per send
+        self._tx_buf = bytearray(self.TOTAL_BINARY_SIZE)
+        self._tx_buf[0:2] = self.BINARY_PREFIX
+        self._tx_buf[2 + 11] = 8
     
     def connect(self, port: str, baudrate: int = 115200) -> bool:
         """Connect to ECU"""
@@ -87,18 +104,16 @@ class PrefixECUClient:
         
         while self.is_running and self.is_connected:
             try:
-                if self.serial_conn.in_waiting > 0:
-                    data = self.serial_conn.read(self.serial_conn.in_waiting)
-                    if data:
-                        self.stats['raw_bytes_received'] += len(data)
-                        
-                        # Add to buffer
-                        self.buffer.extend(data)
-                        
-                        # Process buffer
-                        self._process_buffer_with_prefix()
-                
-                time.sleep(0.001)
+                # Block until at least one byte arrives (or the timeout), then take the burst
+                data = self.serial_conn.read(self.serial_conn.in_waiting or 1)
+                if data:
+                    self.stats['raw_bytes_received'] += len(data)
+                    
+                    # Add to buffer
+                    self.buffer.extend(data)
+                    
+                    # Process buffer
+                    self._process_buffer_with_prefix()
                 
             except Exception as e:
                 logger.error(f"❌ Monitor error: {e}")
@@ -108,7 +123,7 @@ class PrefixECUClient:
     
     def _process_buffer_with_prefix(self):
         """Process buffer using 0xFF 0xFF prefix for binary message framing"""
-        if len(self.buffer) < 2:
+        if len(self.buffer) - self._read_pos < 2:
             return
         
         # Step 1: Look for binary messages with prefix FIRST (before text processing)
@@ -116,94 +131,89 @@ class PrefixECUClient:
         
         # Step 2: Extract complete text lines (after binary processing)
         self._extract_text_lines()
+        
+        # Drop consumed bytes only once enough have built up
+        if self._read_pos == len(self.buffer):
+            self.buffer.clear()
+            self._read_pos = 0
+        elif self._read_pos > 4096:
+            del self.buffer[:self._read_pos]
+            self._read_pos = 0
     
     def _extract_text_lines(self):
         """Extract and process complete text lines"""
-        while True:
-            # Find next newline
-            newline_pos = -1
-            for i, byte in enumerate(self.buffer):
-                if byte == ord('\n'):
-                    newline_pos = i
-                    break
-            
-            if newline_pos == -1:
-                break  # No complete line found
-            
-            # Extract the line (including the newline)
-            line_data = self.buffer[:newline_pos + 1]
-            self.buffer = self.buffer[newline_pos + 1:]
-            
-            # Process the text line
-            try:
-                text = line_data.decode('utf-8', errors='ignore')
-                self._process_text_line(text)
-                self.stats['text_messages'] += 1
-            except Exception as e:
-                logger.debug(f"Text decode error: {e}")
+        # Take every complete line in one go: up to and including the last newline
+        end = self.buffer.rfind(b'\n', self._read_pos)
+        if end == -1:
+            return  # No complete line found
+        
+        chunk = self.buffer[self._read_pos:end + 1]
+        self._read_pos = end + 1
+        
+        # Lines stay as bytes; _process_text_line only decodes the ones it logs
+        lines = chunk.split(b'\n')
+        for line_data in lines[:-1]:
+            self._process_text_line(line_data)
+        self.stats['text_messages'] += len(lines) - 1
     
     def _extract_binary_messages_with_prefix(self):
         """Extract binary messages using 0xFF 0xFF prefix"""
-        if len(self.buffer) < self.TOTAL_BINARY_SIZE:
+        if len(self.buffer) - self._read_pos < self.TOTAL_BINARY_SIZE:
             return
         
-        # Look for 0xFF 0xFF prefix
-        i = 0
-        while i <= len(self.buffer) - self.TOTAL_BINARY_SIZE:
-            # Check for prefix
-            if (self.buffer[i] == 0xFF and self.buffer[i + 1] == 0xFF):
-                self.stats['prefixes_found'] += 1
-                logger.info(f"🔍 Found binary prefix at position {i}")
-                
-                # Extract the CAN message (skip the 2-byte prefix)
-                can_message_data = self.buffer[i + 2:i + 2 + self.CAN_MESSAGE_SIZE]
-                
-                # Try to parse the CAN message
-                if self._try_parse_can_message(can_message_data):
-                    # Successfully parsed, remove the entire message including prefix
-                    self.buffer = self.buffer[i + self.TOTAL_BINARY_SIZE:]
-                    self.stats['binary_messages'] += 1
-                    i = 0  # Reset search position
-                else:
-                    # Parsing failed, move to next position
-                    i += 1
+        # Single forward pass: jump straight to each 0xFF 0xFF candidate and
+        # never rescan bytes already consumed or rejected
+        buf = self.buffer
+        last_start = len(buf) - self.TOTAL_BINARY_SIZE
+        i = buf.find(self.BINARY_PREFIX, self._read_pos)
+        while i != -1 and i <= last_start:
+            self.stats['prefixes_found'] += 1
+            logger.debug("🔍 Found binary prefix at position %d", i - self._read_pos)
+            
+            # Try to parse the CAN message in place (skip the 2-byte prefix)
+            if self._try_parse_can_message(buf, i + 2):
+                # Successfully parsed, consume the entire message including prefix
+                self._read_pos = i + self.TOTAL_BINARY_SIZE
+                self.stats['binary_messages'] += 1
+                i = buf.find(self.BINARY_PREFIX, self._read_pos)
             else:
-                # Not a prefix, move to next position
-                i += 1
+                # Parsing failed, move to the next candidate
+                i = buf.find(self.BINARY_PREFIX, i + 1)
         
         # If buffer is getting too large, trim it
-        if len(self.buffer) > 1024:
-            logger.warning(f"Buffer too large ({len(self.buffer)} bytes), trimming...")
-            self.buffer = self.buffer[-512:]  # Keep last 512 bytes
+        if len(self.buffer) - self._read_pos > 1024:
+            logger.warning(f"Buffer too large ({len(self.buffer) - self._read_pos} bytes), trimming...")
+            del self.buffer[:-512]  # Keep last 512 bytes
+            self._read_pos = 0
     
-    def _process_text_line(self, text: str):
-        """Process a single text line"""
+    def _process_text_line(self, line: bytes):
+        """Process a single raw text line"""
         # Look for specific patterns that indicate binary data
-        if 'Sending binary response' in text:
-            logger.debug(f"🔍 Binary response indicator: {text.strip()}")
+        if b'Sending binary response' in line:
+            logger.debug("🔍 Binary response indicator: %s", line.decode('utf-8', errors='ignore').strip())
         
         # Look for other interesting debug messages
-        if any(keyword in text for keyword in ['ParameterRegistry:', 'SerialBridge:', 'MessageBus:']):
-            logger.debug(f"📝 Debug: {text.strip()}")
+        if any(keyword in line for keyword in self.DEBUG_KEYWORDS):
+            logger.debug("📝 Debug: %s", line.decode('utf-8', errors='ignore').strip())
     
-    def _try_parse_can_message(self, data: bytes) -> bool:
-        """Try to parse a CAN message"""
+    def _try_parse_can_message(self, data: bytes, offset: int = 0) -> bool:
+        """Try to parse the CAN message at offset"""
         try:
-            can_id = struct.unpack('<I', data[0:4])[0]
-            timestamp = struct.unpack('<I', data[4:8])[0]
-            length = data[11]
-            flags = data[10]
-            param_data = data[12:20]
-            reserved = data[20:24]
+            # All fields in one unpack; the parameter ones are only meaningful for length 8
+            (can_id, timestamp, flags, length,
+             operation, value, source_channel, request_id, reserved) = _CAN_FRAME.unpack_from(data, offset)
             
-            logger.info(f"🔍 Parsing CAN message: ID=0x{can_id:08X}, len={length}, data={param_data.hex()}")
+            # Per-frame tracing is DEBUG only; skip building the hex dump otherwise
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("🔍 Parsing CAN message: ID=0x%08X, len=%d, data=%s",
+                             can_id, length, data[offset + 12:offset + 20].hex())
             
             # Only process if it's one of our parameters and has correct length
             if can_id in self.PARAMETERS and length == 8:
-                logger.info(f"✅ Valid parameter message found for {self.PARAMETERS[can_id]['name']}")
-                return self._process_parameter_response(can_id, param_data)
+                logger.debug("✅ Valid parameter message found for %s", self.PARAMETERS[can_id]['name'])
+                return self._process_parameter_response(can_id, operation, value)
             else:
-                logger.info(f"⚠️ Not a valid parameter message: can_id=0x{can_id:08X}, length={length}")
+                logger.debug("⚠️ Not a valid parameter message: can_id=0x%08X, length=%d", can_id, length)
             
             return False
             
@@ -211,15 +221,9 @@ class PrefixECUClient:
             logger.error(f"❌ CAN parse error: {e}")
             return False
     
-    def _process_parameter_response(self, can_id: int, data: bytes) -> bool:
+    def _process_parameter_response(self, can_id: int, operation: int, value: float) -> bool:
         """Process parameter response"""
         try:
-            operation = data[0]
-            value = struct.unpack('<f', data[1:5])[0]
-            source_channel = data[5]
-            request_id = data[6]
-            reserved = data[7]
-            
             if operation != self.READ_RESPONSE:
                 return False
             
@@ -235,7 +239,7 @@ class PrefixECUClient:
                 'unit': unit
             }
             
-            logger.info(f"✅ {param_name}: {value:.2f} {unit} (CAN ID 0x{can_id:08X})")
+            logger.info("✅ %s: %.2f %s (CAN ID 0x%08X)", param_name, value, unit, can_id)
             
             self.stats['total_responses'] += 1
             self.stats['successful_responses'] += 1
@@ -247,50 +251,57 @@ class PrefixECUClient:
             self.stats['parse_errors'] += 1
             return False
     
+    def _pack_request(self, can_id: int) -> bytearray:
+        """Fill the reusable TX frame with a read request for can_id"""
+        message = self._tx_buf
+        _U32.pack_into(message, 2, can_id)
+        _REQ_DATA.pack_into(message, 2 + 12,
+            self.READ_REQUEST,  # Operation
+            0.0,                # Value
+            1,                  # Source channel
+            self.next_request_id,  # Request ID (unsigned byte)
+            0                   # Reserved
+        )
+        self.next_request_id = (self.next_request_id % 255) + 1
+        return message
+    
     def send_parameter_request(self, can_id: int):
         """Send a parameter request"""
         try:
-            param_data = struct.pack('<BfBBb', 
-                self.READ_REQUEST,  # Operation
-                0.0,                # Value
-                1,                  # Source channel
-                self.next_request_id,  # Request ID (unsigned byte)
-                0                   # Reserved
-            )
-            
-            message = bytearray(24)
-            message[0:4] = struct.pack('<I', can_id)
-            message[11] = 8
-            message[12:20] = param_data
-            
-            # Send 0xFF 0xFF prefix first
-            self.serial_conn.write(self.BINARY_PREFIX)
-            # Send the CAN message
-            self.serial_conn.write(bytes(message))
-            self.serial_conn.flush()
+            # 0xFF 0xFF prefix and CAN message go out in a single write
+            self.serial_conn.write(self._pack_request(can_id))
             
             param_name = self.PARAMETERS.get(can_id, {}).get("name", "Unknown")
             logger.info(f"📤 Sent request for {param_name} (CAN ID 0x{can_id:08X})")
             self.stats['total_requests'] += 1
-            self.next_request_id = (self.next_request_id % 255) + 1
             
         except Exception as e:
             logger.error(f"❌ Send error: {e}")
     
     def request_all_parameters(self):
-        """Request all parameters"""
-        for can_id in self.PARAMETERS.keys():
-            self.send_parameter_request(can_id)
-            time.sleep(0.2)  # Small delay between requests
+        """Request all parameters back to back in a single write"""
+        try:
+            size = self.TOTAL_BINARY_SIZE
+            tx = bytearray(len(self.PARAMETERS) * size)
+            for i, can_id in enumerate(self.PARAMETERS):
+                tx[i * size:(i + 1) * size] = self._pack_request(can_id)
+            
+            self.serial_conn.write(tx)
+            
+            logger.info(f"📤 Sent requests for {len(self.PARAMETERS)} parameters")
+            self.stats['total_requests'] += len(self.PARAMETERS)
+            
+        except Exception as e:
+            logger.error(f"❌ Send error: {e}")
     
     def get_status(self) -> Dict[str, Any]:
-        """Get current status"""
+        """Get current status (parameter_values and stats are live read-only views)"""
         return {
             'connected': self.is_connected,
             'running': self.is_running,
-            'buffer_size': len(self.buffer),
-            'parameter_values': self.parameter_values.copy(),
-            'stats': self.stats.copy()
+            'buffer_size': len(self.buffer) - self._read_pos,
+            'parameter_values': MappingProxyType(self.parameter_values),
+            'stats': MappingProxyType(self.stats)
         }
 
 def main():
@@ -3,17 +3,29 @@
 Robust Dashboard - Better handling of mixed text/binary data
 """
 
+import os
+import re
+import selectors
 import serial
 import time
 import struct
 import threading
 import logging
+from types import MappingProxyType
 from typing import Dict, Any
 
 # Configure logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Precompiled little-endian field formats
+_U32 = struct.Struct('<I')
+_F32 = struct.Struct('<f')
+_REQ = struct.Struct('<BfBBb')  # operation, value, source channel, request ID, reserved
+
+# One pass over each text line tags every marker of interest by group name
+_TEXT_KEYWORDS = re.compile(r'(?P<binary>Sending binary response)|(?P<debug>ParameterRegistry:|SerialBridge:|MessageBus:)')
+
 class RobustECUClient:
     """Robust ECU client with better mixed data parsing"""
     
@@ -26,12 +38,19 @@ class RobustECUClient:
     READ_REQUEST = 0x01
     READ_RESPONSE = 0x03
     
+    # Binary message framing used by the firmware in both directions
+    BINARY_PREFIX = bytes([0xFF, 0xFF])
+    CAN_MESSAGE_SIZE = 24
+    TOTAL_BINARY_SIZE = 2 + CAN_MESSAGE_SIZE  # prefix + CAN message
+    
     def __init__(self):
         self.serial_conn = None
         self.is_connected = False
         self.is_running = False
         self.buffer = bytearray()
+        self._read_pos = 0  # Bytes before this index in buffer are consumed
         self.parameter_values = {}
+        self._seq = 0  # Bumped per stored value; larger means fresher
         self.stats = {
             'total_requests': 0,
             'total_responses': 0,
@@ -42,7 +61,16 @@ class RobustECUClient:
             'binary_messages': 0
         }
         self.request_interval = 1.0  # seconds
+        self.display_interval = 1.0  # seconds
         self.next_request_id = 1
+        
+        # Little-endian CAN IDs of PARAMETERS, for prefiltering received frames
+        self._id_prefixes = frozenset(_U32.pack(can_id) for can_id in self.PARAMETERS)
+        
+        # Reusable prefixed request frame; only the CAN ID and request data change per send
+        self._tx_frame = bytearray(self.TOTAL_BINARY_SIZE)
+        self._tx_frame[0:2] = self.BINARY_PREFIX
+        self._tx_frame[2 + 11] = 8
     
     def connect(self, port: str, baudrate: int = 115200) -> bool:
         """Connect to ECU"""
@@ -75,58 +103,123 @@ class RobustECUClient:
         self.monitor_thread.start()
         logger.info("📡 Started serial monitoring")
     
+    def start_requesting(self):
+        """Start thread that requests all parameters every request_interval"""
+        self.request_thread = threading.Thread(target=self._request_loop, daemon=True)
+        self.request_thread.start()
+        logger.info("📤 Started parameter requests")
+    
+    def _request_loop(self):
+        """Request all parameters on a fixed monotonic schedule"""
+        next_request = time.monotonic()
+        while self.is_running and self.is_connected:
+            self.request_all_parameters()
+            
+            next_request += self.request_interval
+            delay = next_request - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_request = time.monotonic()  # Fell behind; don't burst to catch up
+    
     def _monitor_serial(self):
         """Monitor serial port with robust parsing"""
         logger.info("🔍 Starting robust serial monitor...")
         
+        # Let the kernel wake us when the port is readable, then drain what the
+        # driver holds in one read instead of waiting out a read timeout
+        fd = self.serial_conn.fileno()
+        sel = selectors.DefaultSelector()
+        sel.register(fd, selectors.EVENT_READ)
+        
         while self.is_running and self.is_connected:
             try:
-                if self.serial_conn.in_waiting > 0:
-                    data = self.serial_conn.read(self.serial_conn.in_waiting)
-                    if data:
-                        self.stats['raw_bytes_received'] += len(data)
-                        
-                        # Add to buffer
-                        self.buffer.extend(data)
-                        
-                        # Process buffer
-                        self._process_buffer_robust()
+                if not sel.select(timeout=0.1):
+                    continue
+                
+                data = os.read(fd, 4096)
+                if not data:
+                    # Readable but empty means the device went away (e.g. USB
+                    # CDC unplugged); pyserial's read() raises for this too
+                    logger.error("❌ Monitor error: device reports readiness to read but returned no data (disconnected?)")
+                    self.is_connected = False
+                    break
+                
+                self.stats['raw_bytes_received'] += len(data)
                 
-                time.sleep(0.001)
+                # Add to buffer
+                self.buffer.extend(data)
+                
+                # Process buffer
+                self._process_buffer_robust()
                 
             except Exception as e:
                 logger.error(f"❌ Monitor error: {e}")
                 break
         
+        sel.close()
         logger.info("🔍 Serial monitor stopped")
     
     def _process_buffer_robust(self):
         """Robust buffer processing for mixed text/binary data"""
-        if not self.buffer:
+        if self._read_pos >= len(self.buffer):
             return
         
-        # Step 1: Extract complete text lines
-        self._extract_text_lines()
+        # Text lines and 0xFF 0xFF-prefixed binary frames, in stream order
+        self._extract_messages()
         
-        # Step 2: Search for embedded binary messages in remaining data
-        self._extract_binary_messages()
+        # Drop consumed bytes only once enough have built up
+        if self._read_pos == len(self.buffer):
+            self.buffer.clear()
+            self._read_pos = 0
+        elif self._read_pos > 4096:
+            del self.buffer[:self._read_pos]
+            self._read_pos = 0
     
-    def _extract_text_lines(self):
-        """Extract and process complete text lines"""
+    def _extract_messages(self):
+        """Extract text lines and prefixed binary CAN messages in one forward pass
+        
+        The firmware writes every binary response as 0xFF 0xFF followed by the
+        24-byte CAN message, so frames are located with find() instead of by
+        trying every offset. Whichever of the next newline or the next prefix
+        comes first is handled first, so a frame whose payload happens to
+        contain 0x0A is never split up as text.
+        """
+        buf = self.buffer
+        pos = self._read_pos
+        prefix_from = pos  # Prefixes before this failed to parse; don't retry them
+        
         while True:
-            # Find next newline
-            newline_pos = -1
-            for i, byte in enumerate(self.buffer):
-                if byte == ord('\n'):
-                    newline_pos = i
-                    break
+            newline_pos = buf.find(b'\n', pos)
+            prefix_pos = buf.find(self.BINARY_PREFIX, max(pos, prefix_from))
+            
+            if prefix_pos != -1 and (newline_pos == -1 or prefix_pos < newline_pos):
+                if len(buf) - prefix_pos < self.TOTAL_BINARY_SIZE:
+                    break  # Wait for the rest of the frame
+                
+                # Cheap prefilter: one of our parameter IDs with an 8-byte payload
+                start = prefix_pos + 2
+                if bytes(buf[start:start + 4]) not in self._id_prefixes or buf[start + 11] != 8:
+                    prefix_from = prefix_pos + 1
+                    continue
+                
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"🔍 Potential CAN message at position {prefix_pos - pos}: "
+                                 f"{buf[start:prefix_pos + self.TOTAL_BINARY_SIZE].hex()}")
+                if self._try_parse_can_message(buf, start):
+                    # Successfully parsed, consume the message and everything before it
+                    pos = prefix_from = prefix_pos + self.TOTAL_BINARY_SIZE
+                    self.stats['binary_messages'] += 1
+                else:
+                    prefix_from = prefix_pos + 1
+                continue
             
             if newline_pos == -1:
                 break  # No complete line found
             
             # Extract the line (including the newline)
-            line_data = self.buffer[:newline_pos + 1]
-            self.buffer = self.buffer[newline_pos + 1:]
+            line_data = buf[pos:newline_pos + 1]
+            pos = newline_pos + 1
             
             # Process the text line
             try:
@@ -135,78 +228,39 @@ class RobustECUClient:
                 self.stats['text_messages'] += 1
             except Exception as e:
                 logger.debug(f"Text decode error: {e}")
-    
-    def _extract_binary_messages(self):
-        """Extract binary CAN messages from remaining buffer"""
-        if len(self.buffer) < 24:
-            return
-            
-        # Look for patterns that might be CAN messages
-        i = 0
-        while i <= len(self.buffer) - 24:
-            # Check if this could be a CAN message
-            if self._looks_like_can_message(self.buffer[i:i+24]):
-                logger.debug(f"🔍 Potential CAN message at position {i}: {self.buffer[i:i+24].hex()}")
-                if self._try_parse_can_message(self.buffer[i:i+24]):
-                    # Successfully parsed, remove the message and everything before it
-                    self.buffer = self.buffer[i+24:]
-                    self.stats['binary_messages'] += 1
-                    i = 0  # Reset search
-                else:
-                    i += 1
-            else:
-                i += 1
         
-        # If buffer is getting too large, trim it
-        if len(self.buffer) > 1024:
-            logger.warning(f"Buffer too large ({len(self.buffer)} bytes), trimming...")
-            self.buffer = self.buffer[-512:]  # Keep last 512 bytes
-    
-    def _looks_like_can_message(self, data: bytes) -> bool:
-        """Quick check if data might be a CAN message"""
-        if len(data) != 24:
-            return False
+        self._read_pos = pos
         
-        try:
-            # Check CAN ID range (should be reasonable)
-            can_id = struct.unpack('<I', data[0:4])[0]
-            if can_id == 0 or can_id > 0x1FFFFFFF:
-                return False
-            
-            # Check length field
-            length = data[11]
-            if length > 8:
-                return False
-            
-            # Check if it's one of our known parameters
-            if can_id in self.PARAMETERS:
-                return True
-            
-            # For unknown IDs, be more lenient but still check basic structure
-            return True
-            
-        except:
-            return False
+        # If buffer is getting too large, trim it
+        if len(self.buffer) - self._read_pos > 1024:
+            logger.warning(f"Buffer too large ({len(self.buffer) - self._read_pos} bytes), trimming...")
+            del self.buffer[:-512]  # Keep last 512 bytes
+            self._read_pos = 0
     
     def _process_text_line(self, text: str):
         """Process a single text line"""
+        # Every outcome here is a DEBUG log, so skip the scan entirely otherwise
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        
+        tags = {m.lastgroup for m in _TEXT_KEYWORDS.finditer(text)}
+        if not tags:
+            return
+        
         # Look for specific patterns that indicate binary data
-        if 'Sending binary response' in text:
+        if 'binary' in tags:
             logger.debug(f"🔍 Binary response indicator: {text.strip()}")
         
         # Look for other interesting debug messages
-        if any(keyword in text for keyword in ['ParameterRegistry:', 'SerialBridge:', 'MessageBus:']):
+        if 'debug' in tags:
             logger.debug(f"📝 Debug: {text.strip()}")
     
-    def _try_parse_can_message(self, data: bytes) -> bool:
-        """Try to parse a CAN message"""
+    def _try_parse_can_message(self, data: bytes, offset: int = 0) -> bool:
+        """Try to parse the CAN message at offset"""
         try:
-            can_id = struct.unpack('<I', data[0:4])[0]
-            timestamp = struct.unpack('<I', data[4:8])[0]
-            length = data[11]
-            flags = data[10]
-            param_data = data[12:20]
-            reserved = data[20:24]
+            can_id = _U32.unpack_from(data, offset)[0]
+            length = data[offset + 11]
+            param_data = data[offset + 12:offset + 20]
             
             # Only process if it's one of our parameters and has correct length
             if can_id in self.PARAMETERS and length == 8:
@@ -215,14 +269,14 @@ class RobustECUClient:
             return False
             
         except Exception as e:
-            logger.debug(f"❌ CAN parse error: {e}")
+            logger.debug("❌ CAN parse error: %s", e)
             return False
     
     def _process_parameter_response(self, can_id: int, data: bytes) -> bool:
         """Process parameter response"""
         try:
             operation = data[0]
-            value = struct.unpack('<f', data[1:5])[0]
+            value = _F32.unpack_from(data, 1)[0]
             source_channel = data[5]
             request_id = data[6]
             reserved = data[7]
@@ -234,10 +288,11 @@ class RobustECUClient:
             param_name = param_info["name"]
             unit = param_info["unit"]
             
-            # Store the value
+            # Store the value, ranked by arrival order rather than a clock read per frame
+            self._seq += 1
             self.parameter_values[can_id] = {
                 'value': value,
-                'timestamp': time.time(),
+                'seq': self._seq,
                 'name': param_name,
                 'unit': unit
             }
@@ -254,47 +309,56 @@ class RobustECUClient:
             self.stats['parse_errors'] += 1
             return False
     
+    def _pack_request(self, can_id: int) -> bytearray:
+        """Fill the reusable TX frame with a read request for can_id"""
+        message = self._tx_frame
+        _U32.pack_into(message, 2, can_id)
+        _REQ.pack_into(message, 2 + 12,
+            self.READ_REQUEST,  # Operation
+            0.0,                # Value
+            1,                  # Source channel
+            self.next_request_id,  # Request ID (unsigned byte)
+            0                   # Reserved
+        )
+        self.next_request_id = (self.next_request_id % 255) + 1
+        return message
+    
     def send_parameter_request(self, can_id: int):
         """Send a parameter request"""
         try:
-            param_data = struct.pack('<Bfbbb', 
-                self.READ_REQUEST,  # Operation
-                0.0,                # Value
-                1,                  # Source channel
-                self.next_request_id,  # Request ID
-                0                   # Reserved
-            )
-            
-            message = bytearray(24)
-            message[0:4] = struct.pack('<I', can_id)
-            message[11] = 8
-            message[12:20] = param_data
-            
-            self.serial_conn.write(bytes(message))
-            self.serial_conn.flush()
+            self.serial_conn.write(self._pack_request(can_id))
             
             param_name = self.PARAMETERS.get(can_id, {}).get("name", "Unknown")
             logger.info(f"📤 Sent request for {param_name} (CAN ID 0x{can_id:08X})")
             self.stats['total_requests'] += 1
-            self.next_request_id = (self.next_request_id % 255) + 1
             
         except Exception as e:
             logger.error(f"❌ Send error: {e}")
     
     def request_all_parameters(self):
-        """Request all parameters"""
-        for can_id in self.PARAMETERS.keys():
-            self.send_parameter_request(can_id)
-            time.sleep(0.2)  # Small delay between requests
+        """Request all parameters back to back in a single write"""
+        try:
+            size = self.TOTAL_BINARY_SIZE
+            tx = bytearray(len(self.PARAMETERS) * size)
+            for i, can_id in enumerate(self.PARAMETERS):
+                tx[i * size:(i + 1) * size] = self._pack_request(can_id)
+            
+            self.serial_conn.write(tx)
+            
+            logger.info(f"📤 Sent requests for {len(self.PARAMETERS)} parameters")
+            self.stats['total_requests'] += len(self.PARAMETERS)
+            
+        except Exception as e:
+            logger.error(f"❌ Send error: {e}")
     
     def get_status(self) -> Dict[str, Any]:
-        """Get current status"""
+        """Get current status (parameter_values and stats are live read-only views)"""
         return {
             'connected': self.is_connected,
             'running': self.is_running,
-            'buffer_size': len(self.buffer),
-            'parameter_values': self.parameter_values.copy(),
-            'stats': self.stats.copy()
+            'buffer_size': len(self.buffer) - self._read_pos,
+            'parameter_values': MappingProxyType(self.parameter_values),
+            'stats': MappingProxyType(self.stats)
         }
 
 def main():
@@ -308,15 +372,15 @@ def main():
         return
     
     client.start_monitoring()
+    client.start_requesting()
     
     try:
         print("\n📊 Starting parameter monitoring...")
         print("Press Ctrl+C to stop\n")
         
+        # Requests run on their own thread; this loop only redraws
+        next_draw = time.monotonic()
         while True:
-            # Request all parameters
-            client.request_all_parameters()
-            
             # Display current values
             print("\n" + "="*50)
             print("📊 CURRENT VALUES:")
@@ -340,7 +404,8 @@ def main():
             print(f"  Raw bytes: {stats['raw_bytes_received']}")
             print(f"  Buffer size: {status['buffer_size']}")
             
-            time.sleep(client.request_interval)
+            next_draw += client.display_interval
+            time.sleep(max(0.0, next_draw - time.monotonic()))
             
     except KeyboardInterrupt:
         print("\n🛑 Stopping...")
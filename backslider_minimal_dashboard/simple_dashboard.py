@@ -4,15 +4,12 @@ Simple ECU Parameter Dashboard
 Real-time monitoring of Teensy 4.1 ECU parameters
 """
 
-import os
-import sys
+import re
 import struct
 import time
-import datetime
 import threading
-import json
 import logging
-from collections import defaultdict, deque
+from collections import deque
 from typing import Optional, Dict, List, Any
 import serial
 import serial.tools.list_ports
@@ -21,6 +18,13 @@ import serial.tools.list_ports
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Precompiled little-endian field formats
+_U32 = struct.Struct('<I')
+_PARAM_DATA = struct.Struct('<BfBBb')  # operation, value, source channel, request ID, reserved
+
+# ECU debug output markers, matched in one pass per line
+_ECU_DEBUG = re.compile(r'DEBUG:|ERROR:|SerialBridge:|ParameterRegistry:')
+
 class ECUClient:
     """Simple ECU parameter client"""
     
@@ -46,6 +50,11 @@ class ECUClient:
         }
     }
     
+    # Membership-only view of PARAMETERS for the frame parser
+    _PARAM_IDS = frozenset(PARAMETERS)
+    # Their little-endian wire bytes, for resyncing on a frame
+    _PARAM_ID_BYTES = tuple(_U32.pack(can_id) for can_id in PARAMETERS)
+    
     READ_REQUEST = 0x01
     READ_RESPONSE = 0x03
     
@@ -56,7 +65,8 @@ class ECUClient:
         self.request_interval: float = 1.0  # 1Hz
         self.next_request_id: int = 1
         
-        # Parameter values and history
+        # Parameter values and history; history samples are (timestamp, value)
+        # tuples. Sample timestamps are time.monotonic() seconds
         self.parameter_values: Dict[int, float] = {}
         self.parameter_history: Dict[int, deque] = {
             param_id: deque(maxlen=50) for param_id in self.PARAMETERS.keys()
@@ -77,6 +87,13 @@ class ECUClient:
         self.monitor_thread: Optional[threading.Thread] = None
         self.request_thread: Optional[threading.Thread] = None
         self.lock = threading.RLock()
+        
+        # Reusable request frame; the length and the constant parameter data
+        # (operation, value, source channel, reserved) are filled in once, so
+        # only the CAN ID and request ID change per send
+        self._tx_template = bytearray(24)
+        self._tx_template[11] = 8
+        _PARAM_DATA.pack_into(self._tx_template, 12, self.READ_REQUEST, 0.0, 1, 0, 0)
     
     def get_available_ports(self) -> List[Dict[str, str]]:
         """Get list of available serial ports"""
@@ -108,7 +125,7 @@ class ECUClient:
             
             self.is_connected = True
             self.is_running = True
-            self.stats['start_time'] = time.time()
+            self.stats['start_time'] = time.monotonic()
             
             # Start monitoring and request threads
             self.start_threads()
@@ -159,23 +176,33 @@ class ECUClient:
         logger.info("Starting serial monitor thread")
         buffer = bytearray()
         
+        # The connection is fixed for the life of this thread, so look up the
+        # per-read bound methods once rather than on every pass
+        conn = self.serial_conn
+        read = conn.read
+        extend = buffer.extend
+        process = self._process_buffer
+        stats = self.stats
+        
         while self.is_running and self.is_connected and self.serial_conn:
             try:
-                # Read available data
-                if self.serial_conn.in_waiting > 0:
-                    data = self.serial_conn.read(self.serial_conn.in_waiting)
-                    if data:
-                        buffer.extend(data)
-                        self.stats['last_activity'] = time.time()
+                # Block until at least one byte arrives (or the timeout), then take the burst
+                data = read(conn.in_waiting or 1)
+                if not data:
+                    continue
+                extend(data)
+                
+                stats['last_activity'] = time.time()
                 
-                # Process buffer for both text and binary messages
-                buffer = self._process_buffer(buffer)
+                # Frames in one read arrive together, so one clock read stamps them all
+                now = time.monotonic()
+                
+                # Process buffer for both text and binary messages (trims in place)
+                process(buffer, now)
                 
                 # Keep buffer manageable
                 if len(buffer) > 1000:
-                    buffer = buffer[-500:]
-                
-                time.sleep(0.001)  # Small delay to prevent busy waiting
+                    del buffer[:-500]
                 
             except Exception as e:
                 logger.error(f"Error in serial monitor: {e}")
@@ -185,90 +212,101 @@ class ECUClient:
         
         logger.info("Serial monitor thread stopped")
     
-    def _process_buffer(self, buffer: bytearray) -> bytearray:
-        """Process buffer for mixed text and binary messages"""
-        if not buffer:
-            return buffer
+    def _process_buffer(self, buffer: bytearray, now: float) -> bytearray:
+        """Process buffer for mixed text and binary messages, trimming consumed bytes in place
         
-        # First, try to find text messages (lines ending with \n)
-        text_end = -1
-        for i, byte in enumerate(buffer):
-            if byte == ord('\n'):
-                text_end = i + 1
-                break
-        
-        # Process text messages if found
-        if text_end > 0:
-            text_data = buffer[:text_end]
-            self._process_text_messages(text_data)
-            buffer = buffer[text_end:]
-        
-        # Now look for binary CAN messages (exactly 24 bytes)
-        # Search through the entire buffer for valid CAN messages
-        i = 0
-        while i <= len(buffer) - 24:
-            # Check if this looks like a valid CAN message
-            if self._is_valid_can_message(buffer[i:i+24]):
-                if self._try_parse_can_message(buffer[i:i+24]):
-                    # Remove the processed message and everything before it
-                    buffer = buffer[i+24:]
-                    i = 0  # Reset search position
-                else:
-                    i += 1  # Move to next position
+        now is the time.monotonic() arrival time of the data, used to stamp
+        every parameter sample parsed from it.
+        """
+        # Walk the stream in arrival order, taking either a 24-byte binary CAN
+        # message or a text line (up to \n) at each position. A burst holds
+        # line, frame, line, frame, ... back to back, and only the boundaries
+        # between them are tried as frames, so text is never misread as one
+        pos = 0
+        end = len(buffer)
+        while pos < end:
+            if end - pos >= 24:
+                # A frame with a non-parameter ID may really be a short line
+                # (b'\r\n', b'OK\r\n') running into a parameter frame, so only
+                # take it when no parameter frame starts inside its 24 bytes
+                if (self._is_valid_can_message(buffer, pos)
+                        and ((_U32.unpack_from(buffer, pos)[0] in self._PARAM_IDS and buffer[pos + 11] == 8)
+                             or self._find_parameter_frame(buffer, pos + 1, pos + 24) < 0)
+                        and self._try_parse_can_message(buffer, pos, now)):
+                    pos += 24
+                    continue
+            elif end - pos < 4 or 0 < _U32.unpack_from(buffer, pos)[0] <= 0x1FFFFFFF:
+                break  # Possibly a CAN message still arriving
+            
+            # Otherwise a text line, up to the next newline (or everything so
+            # far while no newline has arrived)
+            newline = buffer.find(b'\n', pos)
+            text_end = newline + 1 if newline >= 0 else end
+            
+            # Resync on a parameter response inside that span (noise, or a
+            # line that lost its newline), so it isn't swallowed as text
+            resync = self._find_parameter_frame(buffer, pos + 1, text_end)
+            if resync >= 0:
+                pos = resync
+            elif newline < 0:
+                break  # Incomplete line; wait for the rest
             else:
-                i += 1  # Move to next position
+                self._process_text_line(buffer[pos:text_end])
+                pos = text_end
         
+        if pos:
+            del buffer[:pos]
         return buffer
     
-    def _is_valid_can_message(self, data: bytes) -> bool:
-        """Check if data looks like a valid CAN message"""
-        if len(data) != 24:
-            return False
+    def _find_parameter_frame(self, buffer: bytearray, start: int, stop: int) -> int:
+        """Offset of the first parameter message starting in buffer[start:stop], or -1
         
-        try:
-            # Parse CAN ID (first 4 bytes)
-            can_id = struct.unpack('<I', data[0:4])[0]
-            
-            # Check if CAN ID is reasonable (not text data)
-            if can_id > 0x1FFFFFFF or can_id == 0:  # Extended CAN IDs are 29 bits max
-                return False
-            
-            # Check length field (offset 11)
-            length = data[11]
-            if length > 8:  # Parameter messages are 8 bytes max
-                return False
-            
-            # Check if this is one of our known parameter IDs
-            if can_id in self.PARAMETERS:
-                return True
-            
-            # Could be other valid CAN messages
-            return True
-            
-        except Exception:
+        A match too close to the end of buffer to be complete counts as found,
+        so the caller waits for the rest of it instead of consuming it as text.
+        """
+        found = -1
+        end = len(buffer)
+        for id_bytes in self._PARAM_ID_BYTES:
+            i = buffer.find(id_bytes, start, stop + 3)
+            while 0 <= i < stop and (found < 0 or i < found):
+                if end - i < 24 or (buffer[i + 11] == 8 and self._is_valid_can_message(buffer, i)):
+                    found = i
+                    break
+                i = buffer.find(id_bytes, i + 1, stop + 3)
+        return found
+    
+    def _is_valid_can_message(self, data: bytes, offset: int = 0) -> bool:
+        """Check if the 24 bytes at offset look like a valid CAN message"""
+        if len(data) - offset < 24:
             return False
+        
+        # With 24 bytes in range neither read below can raise, so no try block.
+        # A reasonable CAN ID (nonzero, extended IDs are 29 bits max, so not
+        # text data) and a length field of at most 8 bytes; known parameter
+        # IDs and other valid CAN messages alike
+        can_id = _U32.unpack_from(data, offset)[0]
+        return 0 < can_id <= 0x1FFFFFFF and data[offset + 11] <= 8
     
-    def _try_parse_can_message(self, buffer: bytearray) -> bool:
-        """Try to parse a CAN message from buffer"""
+    def _try_parse_can_message(self, buffer: bytearray, offset: int, now: float) -> bool:
+        """Try to parse the CAN message at offset in buffer"""
         try:
-            if len(buffer) < 24:
+            if len(buffer) - offset < 24:
                 return False
             
             # Parse CAN message structure (correct Teensy 4.1 offsets)
-            can_id = struct.unpack('<I', buffer[0:4])[0]      # CAN ID at offset 0
-            timestamp = struct.unpack('<I', buffer[4:8])[0]   # Timestamp at offset 4
-            length = buffer[11]                               # Length at offset 11
-            flags = buffer[10]                                # Flags at offset 10
-            data = buffer[12:20]                              # Data buffer at offset 12
-            reserved = buffer[20:24]                          # Reserved at offset 20
+            can_id = _U32.unpack_from(buffer, offset)[0]      # CAN ID at offset 0
+            timestamp = _U32.unpack_from(buffer, offset + 4)[0]  # Timestamp at offset 4
+            length = buffer[offset + 11]                      # Length at offset 11
+            flags = buffer[offset + 10]                       # Flags at offset 10
+            # Data buffer at offset 12, reserved at offset 20
             
             # Validate message
             if length > 8:
                 return False
             
             # Check if this is a parameter response
-            if can_id in self.PARAMETERS and length == 8:
-                return self._process_parameter_response(can_id, data)
+            if can_id in self._PARAM_IDS and length == 8:
+                return self._process_parameter_response(can_id, buffer[offset + 12:offset + 20], now)
             
             return True  # Valid CAN message but not a parameter response
             
@@ -276,18 +314,14 @@ class ECUClient:
             logger.debug(f"Failed to parse CAN message: {e}")
             return False
     
-    def _process_parameter_response(self, can_id: int, data: bytes) -> bool:
+    def _process_parameter_response(self, can_id: int, data: bytes, now: float) -> bool:
         """Process parameter response message"""
         try:
             if len(data) < 8:
                 return False
             
             # Parse parameter message
-            operation = data[0]
-            value = struct.unpack('<f', data[1:5])[0]
-            source_channel = data[5]
-            request_id = data[6]
-            reserved = data[7]
+            operation, value, source_channel, request_id, reserved = _PARAM_DATA.unpack_from(data, 0)
             
             # Validate response
             if operation != self.READ_RESPONSE:
@@ -297,17 +331,15 @@ class ECUClient:
             if not param_info:
                 return False
             
-            # Update statistics
-            with self.lock:
-                self.stats['total_responses'] += 1
-                self.stats['successful_responses'] += 1
-                
-                # Store parameter value
-                self.parameter_values[can_id] = value
-                self.parameter_history[can_id].append({
-                    'timestamp': time.time(),
-                    'value': value
-                })
+            # Update statistics; only the monitor thread writes these, and each
+            # dict/deque update is atomic under the GIL, so no lock is taken
+            stats = self.stats
+            stats['total_responses'] += 1
+            stats['successful_responses'] += 1
+            
+            # Store parameter value
+            self.parameter_values[can_id] = value
+            self.parameter_history[can_id].append((now, value))
             
             logger.info(f"✅ {param_info['name']}: {value:.2f} {param_info['unit']} (CAN ID 0x{can_id:08X})")
             return True
@@ -317,22 +349,18 @@ class ECUClient:
             self.stats['parse_errors'] += 1
             return False
     
-    def _process_text_messages(self, buffer: bytearray):
-        """Process any text debug messages in buffer"""
+    def _process_text_line(self, data: bytearray):
+        """Process one newline-terminated text debug message"""
         try:
-            # Decode text and look for debug patterns
-            text = buffer.decode('utf-8', errors='ignore')
-            if text.strip():
-                lines = text.split('\n')
-                for line in lines:
-                    line = line.strip()
-                    if line:
-                        # Look for ECU debug messages
-                        if any(pattern in line for pattern in ['DEBUG:', 'ERROR:', 'SerialBridge:', 'ParameterRegistry:']):
-                            logger.debug(f"ECU: {line}")
-                        # Look for binary response indicators
-                        elif 'Sending binary response' in line:
-                            logger.info(f"ECU: {line}")
+            # _process_buffer hands over exactly one line, so no split is needed
+            line = data.decode('utf-8', errors='ignore').strip()
+            if line:
+                # Look for ECU debug messages
+                if _ECU_DEBUG.search(line):
+                    logger.debug(f"ECU: {line}")
+                # Look for binary response indicators
+                elif 'Sending binary response' in line:
+                    logger.info(f"ECU: {line}")
         except Exception as e:
             logger.debug(f"Text processing error: {e}")
     
@@ -342,10 +370,8 @@ class ECUClient:
         
         while self.is_running and self.is_connected:
             try:
-                # Send requests for all parameters with delays between them
-                for can_id, param_info in self.PARAMETERS.items():
-                    self._send_parameter_request(can_id)
-                    time.sleep(0.2)  # 200ms delay between requests
+                # Send requests for all parameters in one write
+                self._send_parameter_requests()
                 
                 time.sleep(self.request_interval)
                 
@@ -357,44 +383,41 @@ class ECUClient:
         
         logger.info("Parameter request thread stopped")
     
-    def _send_parameter_request(self, can_id: int):
-        """Send a parameter request"""
+    def _pack_request(self, can_id: int) -> bytearray:
+        """Fill the reusable request frame for can_id and advance the request ID"""
+        message = self._tx_template
+        _U32.pack_into(message, 0, can_id)        # CAN ID
+        message[12 + 6] = self.next_request_id    # Request ID
+        self.next_request_id = (self.next_request_id % 255) + 1
+        return message
+    
+    def _send_parameter_requests(self):
+        """Send requests for all parameters back to back in a single write"""
         try:
             if not self.serial_conn or not self.serial_conn.is_open:
                 return
             
-            # Create parameter request data
-            param_data = struct.pack('<Bfbbb', 
-                self.READ_REQUEST,  # Operation
-                0.0,                # Value (ignored for requests)
-                1,                  # Source channel
-                self.next_request_id, # Request ID
-                0                   # Reserved
-            )
-            
-            # Create binary CAN message
-            message = bytearray(24)
-            message[0:4] = struct.pack('<I', can_id)  # CAN ID
-            message[11] = 8                           # Length
-            message[12:20] = param_data               # Parameter data
+            # Build every binary CAN message into one buffer
+            tx = bytearray(len(self.PARAMETERS) * 24)
+            for i, can_id in enumerate(self.PARAMETERS):
+                tx[i * 24:(i + 1) * 24] = self._pack_request(can_id)
             
-            # Send message
-            self.serial_conn.write(bytes(message))
+            # Send messages
+            self.serial_conn.write(tx)
             self.serial_conn.flush()
             
             with self.lock:
-                self.stats['total_requests'] += 1
-                self.next_request_id = (self.next_request_id % 255) + 1
+                self.stats['total_requests'] += len(self.PARAMETERS)
             
-            logger.info(f"📤 Sent request for {self.PARAMETERS[can_id]['name']} (CAN ID 0x{can_id:08X})")
+            logger.info(f"📤 Sent requests for {len(self.PARAMETERS)} parameters")
             
         except Exception as e:
-            logger.error(f"Error sending parameter request: {e}")
+            logger.error(f"Error sending parameter requests: {e}")
     
     def get_status(self) -> Dict[str, Any]:
         """Get current status"""
         with self.lock:
-            uptime = time.time() - self.stats['start_time'] if self.stats['start_time'] else 0
+            uptime = time.monotonic() - self.stats['start_time'] if self.stats['start_time'] else 0
             
             return {
                 'connected': self.is_connected,
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for the CAN dashboard's endianness-learning float decoders
+"""
+
+import struct
+import unittest
+
+try:
+    from can_dashboard import CANDashboard
+except ImportError:  # Flask, Flask-SocketIO or pyserial not installed
+    CANDashboard = None
+
+
+def _le(value):
+    return struct.pack('<f', value) + bytes(4)
+
+
+def _be(value):
+    return struct.pack('>f', value) + bytes(4)
+
+
+@unittest.skipIf(CANDashboard is None, "dashboard dependencies not installed")
+class RangeDecoderTest(unittest.TestCase):
+    def test_out_of_range_readings_do_not_flip_byte_order(self):
+        decode = CANDashboard._make_range_decoder(50, 400)  # Temperature
+
+        # Cold start: a long run of real little-endian readings below range
+        for value in (20.0, 25.0, 30.0, 35.0, 40.0) * 10:
+            self.assertEqual(decode(_le(value)), value)
+
+        # Still decoding little-endian once the reading comes into range
+        self.assertEqual(decode(_le(90.0)), 90.0)
+
+    def test_noise_spike_does_not_flip_byte_order(self):
+        decode = CANDashboard._make_range_decoder(0, 200)  # Speed
+
+        for _ in range(20):
+            self.assertEqual(decode(_le(60.0)), 60.0)
+        for _ in range(30):
+            self.assertEqual(decode(_le(5000.0)), 5000.0)
+        self.assertEqual(decode(_le(61.0)), 61.0)
+
+    def test_big_endian_sender_is_learned(self):
+        decode = CANDashboard._make_range_decoder(50, 400)
+
+        for value in (100.0, 110.0, 120.0, 130.0, 140.0):
+            self.assertEqual(decode(_be(value)), value)
+
+        # Once switched, an out-of-range big-endian reading is passed through
+        # rather than being decoded little-endian
+        self.assertEqual(decode(_be(20.0)), 20.0)
+
+
+if __name__ == '__main__':
+    unittest.main()